@@ -0,0 +1,312 @@
+"""
+搜索型电脑玩家：信息集蒙特卡洛树搜索（ISMCTS）
+每次决策从牌桌克隆一局推演用的对局，每轮迭代先按公开信息重新分配对手暗牌（确定化），
+再沿搜索树选择、扩展一步、随机走完整局，把胜负回传到路径上的每条边
+树节点按搜索方视角的信息集哈希（GameManager.info_zobrist）存放在置换表里：
+不同走法到达同一局面时共用一个节点，同一回合、后续回合乃至共用置换表的其他对局都能直接沿用已有统计
+"""
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+from coup_basic import ActionType, ComputerPlayer, GameManager, GameState, Phase, Role
+from coup_belief import BeliefModel, BeliefTracker
+from coup_sampler import HandSampler
+
+ROLLOUT_STEP_LIMIT = 2000  # 每轮迭代（树内+随机推演）的决策数上限，超出按存活玩家平分胜负
+
+
+def decision_key(decision: Any) -> Any:
+    """把决策转换为可哈希的边键：行动为(行动, 目标)，保留牌列表为元组"""
+    if isinstance(decision, dict):
+        return decision["action"], decision["target_id"]
+    if isinstance(decision, list):
+        return tuple(decision)
+    return decision
+
+
+class Edge:
+    """
+    节点上一个决策的统计
+        visits  选择该决策的迭代数
+        wins    决策者在这些迭代中赢得的局数（平局按份额计）
+        avail   所在节点被访问且该决策合法的次数（不同确定化下合法决策不同，UCB按它计算探索项）
+    """
+    __slots__ = ("visits", "wins", "avail")
+
+    def __init__(self):
+        self.visits = 0
+        self.wins = 0.0
+        self.avail = 1
+
+
+class Node:
+    """搜索方视角下的一个信息集：mover 为该局面的决策者座位号，edges 为决策键 -> Edge"""
+    __slots__ = ("mover", "edges", "visits")
+
+    def __init__(self, mover: int):
+        self.mover = mover
+        self.edges: Dict[Any, Edge] = {}
+        self.visits = 0
+
+
+class TranspositionTable:
+    """
+    定长置换表：局面哈希 -> Node，容量向上取整到2的幂，每个哈希映射到相邻两格组成的桶
+    写入时替换策略依次为：同一哈希 > 空格 > 较早的搜索代次留下的 > 访问次数较少的
+    节点之间不互相引用（边只记统计，子节点按哈希查表），被挤出的节点连同其统计一起释放，内存严格有界
+    多名玩家（甚至多局对局）可共用一张表；哈希含搜索方的暗牌和座位，不同玩家的节点不会混用
+    """
+    __slots__ = ("mask", "keys", "nodes", "ages", "age", "hits", "misses")
+
+    def __init__(self, capacity: int = 1 << 16):
+        size = 1 << max(1, (capacity - 1).bit_length())
+        self.mask = size - 2  # 桶的起始下标为偶数
+        self.keys: List[Optional[int]] = [None] * size
+        self.nodes: List[Optional[Node]] = [None] * size
+        self.ages: List[int] = [0] * size
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(1 for k in self.keys if k is not None)
+
+    def new_search(self):
+        """开始新一次搜索，之前的节点在替换时让位于本次搜索的节点"""
+        self.age += 1
+
+    def get(self, key: int) -> Optional[Node]:
+        i = key & self.mask
+        keys = self.keys
+        if keys[i] != key:
+            i += 1
+            if keys[i] != key:
+                self.misses += 1
+                return None
+        self.hits += 1
+        self.ages[i] = self.age
+        return self.nodes[i]
+
+    def put(self, key: int, node: Node):
+        i = key & self.mask
+        keys = self.keys
+        if keys[i] is not None and keys[i] != key:
+            j = i + 1
+            if keys[j] is None or keys[j] == key:
+                i = j
+            else:
+                ages = self.ages
+                nodes = self.nodes
+                # 较早代次的先让位；同代时留下访问次数多的
+                if (ages[j], nodes[j].visits) < (ages[i], nodes[i].visits):
+                    i = j
+        keys[i] = key
+        self.nodes[i] = node
+        self.ages[i] = self.age
+
+    def clear(self):
+        size = len(self.keys)
+        self.keys = [None] * size
+        self.nodes = [None] * size
+        self.ages = [0] * size
+
+
+class ISMCTSPlayer(ComputerPlayer):
+    """
+    实现与 ComputerPlayer 相同的决策方法，每次决策在克隆的对局上搜索：
+        iterations   每次决策的迭代数上限
+        time_budget  每次决策的耗时上限（秒），None表示只按迭代数；设置后结果不再可复现
+        exploration  UCB探索系数
+        belief_model 设置后入座时以自己的视角订阅 BeliefTracker，确定化按信念加权抽取对手暗牌
+        table        共用的 TranspositionTable；为None时每名玩家第一次搜索时各建一张 table_size 格的表
+    参数是类属性，需要不同配置时定义子类；参加锦标赛的子类须定义在模块顶层
+    只有通过 GameManager 状态机询问时才会搜索，其余情况（如同步的 exchange_two_cards）退回随机策略
+    """
+    __slots__ = ("game", "beliefs", "_sim", "_table", "playouts")
+
+    iterations: int = 400
+    time_budget: Optional[float] = None
+    exploration: float = 0.7
+    belief_model: Optional[BeliefModel] = None
+    table: Optional[TranspositionTable] = None
+    table_size: int = 1 << 16
+
+    def __init__(self, player_name: str, player_id: int, cards: List[Role]):
+        super().__init__(player_name, player_id, cards)
+        self.game: Optional[GameManager] = None
+        self.beliefs: Optional[BeliefTracker] = None
+        self._sim: Optional[GameManager] = None  # 推演用的克隆对局，每次决策重新克隆
+        self._table: Optional[TranspositionTable] = self.table
+        self.playouts = 0  # 累计推演局数
+
+    def join_table(self, gm: GameManager, subscribe: bool = True):
+        super().join_table(gm, subscribe)
+        self.game = gm
+        self._sim = None
+        # 克隆对局里的副本不维护信念，也不与原玩家共用同一个 BeliefTracker
+        self.beliefs = None
+        if subscribe and self.belief_model is not None:
+            self.beliefs = BeliefTracker(self.belief_model, viewer=self)
+            self.beliefs.attach(gm.bus)
+
+    # ===== 决策接口 =====
+    def _searching(self, phase: Phase) -> bool:
+        gm = self.game
+        return gm is not None and gm.phase is phase and gm.decider is self
+
+    def get_player_choice(self, target_list):
+        if not self._searching(Phase.ACTION):
+            return super().get_player_choice(target_list)
+        return self.search()
+
+    def challenge_or_not(self, pl, ro: Role) -> bool:
+        if not self._searching(Phase.CHALLENGE):
+            return super().challenge_or_not(pl, ro)
+        return self.search()
+
+    def target_answer(self, action: ActionType):
+        if not self._searching(Phase.COUNTER):
+            return super().target_answer(action)
+        return self.search()
+
+    def deal_challenge(self):
+        if not self._searching(Phase.REVEAL_PROOF):
+            return super().deal_challenge()
+        return self.search()
+
+    def lose_influence(self):
+        if not self._searching(Phase.LOSE_INFLUENCE):
+            return super().lose_influence()
+        return self.search()
+
+    def select_cards_to_keep(self, new_cards: List[Role], hidden_cards: List[Role],
+                             keep_count: int) -> List[Role]:
+        if not self._searching(Phase.EXCHANGE):
+            return super().select_cards_to_keep(new_cards, hidden_cards, keep_count)
+        return list(self.search())
+
+    # ===== 搜索 =====
+    def search(self) -> Any:
+        """在当前牌桌上搜索，返回访问次数最多的合法决策"""
+        gm = self.game
+        legal = gm.legal_decisions()
+        if len(legal) == 1:
+            return legal[0]
+
+        table = self._table
+        if table is None:
+            table = self._table = TranspositionTable(self.table_size)
+        table.new_search()
+        # 根节点在本次搜索中一直持有引用，即使在表里被挤出也不影响结果
+        key = gm.info_zobrist(self.player_id)
+        root = table.get(key)
+        if root is None:
+            root = Node(self.player_id)
+            table.put(key, root)
+
+        sim = gm.clone()
+        sim.rng.seed(self.rng.getrandbits(64))
+        self._sim = sim
+        state = sim.snapshot()
+        sampler = HandSampler.for_player(gm, self.player_id)
+        weights = self.beliefs.weights(sampler.seats) if self.beliefs is not None else None
+
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        done = 0
+        while done < self.iterations:
+            if deadline is not None and done and time.perf_counter() > deadline:
+                break
+            self._iterate(root, key, state, sampler, weights)
+            done += 1
+        self.playouts += done
+        self._sim = None
+
+        edges = root.edges
+
+        def visits(d):
+            edge = edges.get(decision_key(d))
+            return edge.visits if edge is not None else -1
+
+        return max(legal, key=visits)
+
+    def _iterate(self, root: Node, root_key: int, state: GameState, sampler: HandSampler,
+                 weights: Optional[list]):
+        sim = self._sim
+        rng = sim.rng
+        sim.restore(state, rng=False)
+        # 确定化：按公开信息重新分配对手暗牌和牌堆
+        hands, deck = sampler.sample(rng, weights)
+        sampler.apply(sim, hands, deck)
+        table = self._table
+        c = self.exploration
+        me = self.player_id
+        path = []  # [(Edge, 决策者座位号)]
+        node = root
+        seen = {root_key}  # 本轮已经过的信息集
+        steps = 0
+
+        # 选择与扩展：按信息集哈希查表下行，遇到新局面或尚未尝试的合法决策时扩展一步后转入随机推演
+        # 哈希不含回合数，置换表构成的图可能有环；本轮再次走到同一信息集时直接转入随机推演，每条边只回传一次
+        while sim.phase is not Phase.GAME_OVER and steps < ROLLOUT_STEP_LIMIT:
+            if node is None:
+                key = sim.info_zobrist(me)
+                if key in seen:
+                    break
+                seen.add(key)
+                node = table.get(key)
+                if node is None:
+                    node = Node(sim.decider.player_id)
+                    table.put(key, node)
+            node.visits += 1
+            mover = node.mover
+            edges = node.edges
+            untried = []
+            best = None
+            best_score = -1.0
+            for d in sim.legal_decisions():
+                k = decision_key(d)
+                edge = edges.get(k)
+                if edge is None:
+                    untried.append((k, d))
+                    continue
+                edge.avail += 1
+                score = (edge.wins / edge.visits
+                         + c * math.sqrt(math.log(edge.avail) / edge.visits))
+                if score > best_score:
+                    best_score = score
+                    best = (edge, d)
+            steps += 1
+            if untried:
+                k, d = untried[int(rng.random() * len(untried))]
+                edge = edges[k] = Edge()
+                path.append((edge, mover))
+                sim.step(d)
+                break
+            edge, d = best
+            path.append((edge, mover))
+            sim.step(d)
+            node = None
+
+        # 随机推演
+        while sim.phase is not Phase.GAME_OVER and steps < ROLLOUT_STEP_LIMIT:
+            legal = sim.legal_decisions()
+            sim.step(legal[int(rng.random() * len(legal))])
+            steps += 1
+
+        # 回传：获胜者得1分；推演被截断时存活玩家平分
+        winner = sim.winner
+        alive = sim._alive_flags
+        share = 1.0 / max(1, sim._alive_count)
+        for edge, mover in path:
+            edge.visits += 1
+            if winner is not None:
+                if mover == winner.player_id:
+                    edge.wins += 1.0
+            elif alive[mover]:
+                edge.wins += share
+
+
+class BeliefISMCTSPlayer(ISMCTSPlayer):
+    """按默认 BeliefModel 推断对手暗牌的 ISMCTSPlayer"""
+    belief_model = BeliefModel()
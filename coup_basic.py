@@ -1,8 +1,10 @@
 from enum import Enum
 import random
-from random import shuffle
+import copy
+import hashlib
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from itertools import combinations
+from typing import List, Dict, Any, Optional, Callable
 from dataclasses import dataclass
 import time
 
@@ -15,6 +17,14 @@ class Role(Enum):
     AMBASSADOR = "ambassador"
     CONTESSA = "contessa"
 
+    # 枚举成员唯一，按身份哈希即可；Enum默认的__hash__是Python层实现，作字典键时开销明显
+    __hash__ = object.__hash__
+
+
+# 角色的固定编码顺序，牌堆计数向量和紧凑状态都按此下标存储
+ROLES = tuple(Role)
+ROLE_INDEX = {role: idx for idx, role in enumerate(ROLES)}
+
 
 class ActionType(Enum):
     """行动类型枚举"""
@@ -26,6 +36,8 @@ class ActionType(Enum):
     STEAL = "steal"
     EXCHANGE = "exchange"
 
+    __hash__ = object.__hash__
+
 
 @dataclass
 class ActionMetadata:
@@ -94,6 +106,299 @@ ACTION_CONFIG = {
 
 
 
+# ==================== 节奏控制（模拟思考时间） ====================
+
+class Pacer(ABC):
+    """节奏控制器：决定CPU玩家"思考"时是否真的停顿"""
+
+    @abstractmethod
+    def pause(self, low: float = 1.0, high: float = 4.0):
+        """停顿一段[low, high]秒之间的随机时长"""
+        pass
+
+
+class RealTimePacer(Pacer):
+    """真实停顿，用于有人类玩家的牌桌"""
+
+    def pause(self, low: float = 1.0, high: float = 4.0):
+        time.sleep(random.uniform(low, high))
+
+
+class NullPacer(Pacer):
+    """零延迟，用于批量模拟"""
+
+    def pause(self, low: float = 1.0, high: float = 4.0):
+        pass
+
+
+class VirtualClock(Pacer):
+    """虚拟时钟：不真正停顿，只累计本应消耗的思考时间"""
+
+    def __init__(self):
+        self.elapsed: float = 0.0  # 累计的虚拟秒数
+        self.pauses: int = 0  # 停顿次数
+
+    def pause(self, low: float = 1.0, high: float = 4.0):
+        self.elapsed += random.uniform(low, high)
+        self.pauses += 1
+
+
+# ==================== 事件总线 ====================
+# 游戏过程以类型化事件的形式发布，控制台输出只是其中一个订阅者
+# 发布方先判断 `if bus:`，无人订阅时既不创建事件对象也不格式化任何字符串
+
+@dataclass(frozen=True)
+class GameEvent:
+    """事件基类"""
+
+
+@dataclass(frozen=True)
+class PlayersSeated(GameEvent):
+    """玩家创建完成并排好座次；copies 为本局每种角色的牌数"""
+    players: List['Player']
+    copies: int
+
+
+@dataclass(frozen=True)
+class TurnStarted(GameEvent):
+    """新回合开始"""
+    turn: int
+    player: 'Player'
+    players: List['Player']
+
+
+@dataclass(frozen=True)
+class ActionDeclared(GameEvent):
+    """当回合玩家宣布行动"""
+    actor: 'Player'
+    action: ActionType
+    target_id: Optional[int]
+
+
+@dataclass(frozen=True)
+class ChallengeDeclared(GameEvent):
+    """有玩家对某角色宣称发起质疑"""
+    challenger: 'Player'
+    claimant: 'Player'
+    role: Role
+
+
+@dataclass(frozen=True)
+class ChallengeResolved(GameEvent):
+    """质疑结算，succeeded为True表示宣称者并无该角色或放弃亮牌"""
+    challenger: 'Player'
+    claimant: 'Player'
+    role: Role
+    succeeded: bool
+
+
+@dataclass(frozen=True)
+class CounterDeclared(GameEvent):
+    """有玩家宣称反制角色"""
+    player: 'Player'
+    role: Role
+    action: ActionType
+
+
+@dataclass(frozen=True)
+class CoinsSpent(GameEvent):
+    """支付行动花费"""
+    player: 'Player'
+    amount: int
+    action: ActionType
+
+
+@dataclass(frozen=True)
+class CoinsGained(GameEvent):
+    """收入、外援、税收获得金币"""
+    player: 'Player'
+    amount: int
+    action: ActionType
+
+
+@dataclass(frozen=True)
+class CoinsStolen(GameEvent):
+    """偷窃结算"""
+    actor: 'Player'
+    target: 'Player'
+    amount: int
+
+
+@dataclass(frozen=True)
+class Assassinated(GameEvent):
+    """暗杀结算"""
+    actor: 'Player'
+    target: 'Player'
+
+
+@dataclass(frozen=True)
+class CoupLaunched(GameEvent):
+    """政变结算"""
+    actor: 'Player'
+    target: 'Player'
+
+
+@dataclass(frozen=True)
+class CardSwapped(GameEvent):
+    """应对质疑亮牌后，将该牌放回牌堆并重新抽一张"""
+    player: 'Player'
+    returned: Role
+    drawn: Role
+
+
+@dataclass(frozen=True)
+class ExchangeCompleted(GameEvent):
+    """大使换牌结算"""
+    player: 'Player'
+    drawn: List[Role]
+    kept: List[Role]
+    returned: List[Role]
+
+
+@dataclass(frozen=True)
+class InfluenceRevealed(GameEvent):
+    """翻开一张影响力牌，forced表示只剩一张无需选择"""
+    player: 'Player'
+    role: Role
+    forced: bool
+
+
+@dataclass(frozen=True)
+class PlayerEliminated(GameEvent):
+    """玩家失去所有影响力"""
+    player: 'Player'
+
+
+@dataclass(frozen=True)
+class GameEnded(GameEvent):
+    """游戏结束，winner为None表示没有存活玩家"""
+    winner: Optional['Player']
+
+
+@dataclass(frozen=True)
+class Notice(GameEvent):
+    """少见的提示信息（如换牌失败）"""
+    text: str
+
+
+class EventBus:
+    """按事件类型分发的同步事件总线"""
+
+    def __init__(self):
+        self._subscribers: Dict[type, List[Callable[[GameEvent], None]]] = {}
+        self._wildcards: List[Callable[[GameEvent], None]] = []
+
+    def subscribe(self, handler: Callable[[GameEvent], None], *event_types: type):
+        """订阅指定类型的事件，不指定类型则订阅全部事件"""
+        if not event_types:
+            self._wildcards.append(handler)
+        for et in event_types:
+            self._subscribers.setdefault(et, []).append(handler)
+
+    def unsubscribe(self, handler: Callable[[GameEvent], None]):
+        """取消该处理函数的全部订阅"""
+        if handler in self._wildcards:
+            self._wildcards.remove(handler)
+        for et in list(self._subscribers):
+            handlers = [h for h in self._subscribers[et] if h != handler]
+            if handlers:
+                self._subscribers[et] = handlers
+            else:
+                del self._subscribers[et]
+
+    def wants(self, event_type: type) -> bool:
+        """是否有订阅者关心该类型事件"""
+        return bool(self._wildcards) or event_type in self._subscribers
+
+    def publish(self, event: GameEvent):
+        for h in self._wildcards:
+            h(event)
+        for h in self._subscribers.get(type(event), ()):
+            h(event)
+
+    def __bool__(self):
+        # 发布前用 `if bus:` 判断，无人订阅时跳过事件构造
+        return bool(self._wildcards) or bool(self._subscribers)
+
+
+class ConsoleRenderer:
+    """将事件渲染为控制台文字的订阅者（有头模式下默认订阅）"""
+
+    def __call__(self, event: GameEvent):
+        render = getattr(self, "_on_" + type(event).__name__, None)
+        if render:
+            render(event)
+
+    def _on_PlayersSeated(self, e: PlayersSeated):
+        print(f"\n=== 玩家创建完成===")
+        for p in e.players:
+            type_str = "人类" if isinstance(p, HumanPlayer) else "电脑"
+            print(f"玩家 {p.player_id}: ({type_str}) - 手牌: {len(p.influence)}张")
+        print()
+
+    def _on_TurnStarted(self, e: TurnStarted):
+        print("=" * 40)
+        print(f"第{e.turn}回合-当前玩家:{e.player.name}")
+        for p in e.players:
+            p.display()
+
+    def _on_ActionDeclared(self, e: ActionDeclared):
+        print(f"玩家{e.actor.name}选择进行{e.action}"
+              + (f"，行动目标为{e.target_id}号玩家" if e.target_id is not None else ""))
+
+    def _on_ChallengeDeclared(self, e: ChallengeDeclared):
+        print(f"质疑者：{e.challenger}")
+
+    def _on_CounterDeclared(self, e: CounterDeclared):
+        print(f"{e.player.name}宣言使用{e.role.value}反制！")
+
+    def _on_CoinsSpent(self, e: CoinsSpent):
+        print(f"{e.player.name}消耗了{e.amount}金币执行{e.action.value}")
+
+    def _on_CoinsGained(self, e: CoinsGained):
+        print(f"{e.player.name}执行{ACTION_CONFIG[e.action].name_cn}，获得{e.amount}金币")
+
+    def _on_CoinsStolen(self, e: CoinsStolen):
+        print(f"{e.actor.name}从{e.target.name}偷窃了{e.amount}金币")
+
+    def _on_Assassinated(self, e: Assassinated):
+        print(f"{e.actor.name}暗杀{e.target.name}成功")
+
+    def _on_CoupLaunched(self, e: CoupLaunched):
+        print(f"{e.actor.name}发动政变，目标{e.target.name}失去1影响力")
+
+    def _on_CardSwapped(self, e: CardSwapped):
+        print(f"{e.player.name}放回了一张{e.returned.value}牌")
+        print(f"{e.player.name}抽到了一张{e.drawn.value}牌")
+
+    def _on_ExchangeCompleted(self, e: ExchangeCompleted):
+        print(f"\n🃏 牌堆提供的新牌: {[c.value for c in e.drawn]}")
+        if not isinstance(e.player, HumanPlayer):
+            print(f"{e.player.name}(AI) 选择保留: {[c.value for c in e.kept]}")
+        print(f"🔄 放回牌堆: {[c.value for c in e.returned]}")
+        print(f"✅ 换牌完成！{e.player.name}现在有 {len(e.kept)} 张暗牌")
+
+    def _on_InfluenceRevealed(self, e: InfluenceRevealed):
+        if e.forced:
+            print(f"{e.player.name}翻开唯一的影响力牌：{e.role.value}")
+        else:
+            print(f"{e.player.name}选择翻开：{e.role.value}")
+
+    def _on_PlayerEliminated(self, e: PlayerEliminated):
+        print(f"{e.player.player_id}号玩家失去所有影响力")
+
+    def _on_GameEnded(self, e: GameEnded):
+        if e.winner:
+            print(f"\n{'=' * 50}")
+            print(f"🏆 游戏结束！获胜者: {e.winner.name} (ID:{e.winner.player_id})")
+            print(f"{'=' * 50}")
+        else:
+            print("\n游戏异常结束：没有存活玩家")
+
+    def _on_Notice(self, e: Notice):
+        print(e.text)
+
+
 # 定义行动处理器接口
 
 class ActionHandler(ABC):
@@ -114,8 +419,9 @@ class IncomeHandler(ActionHandler):
     """收入处理器"""
 
     def execute(self, gm: 'GameManager', actor: 'Player', choice: Dict) -> bool:
-        actor.get_coin(1)
-        print(f"{actor.name}执行收入，获得1金币")
+        gm.adjust_coins(actor, 1)
+        if gm.bus:
+            gm.bus.publish(CoinsGained(actor, 1, ActionType.INCOME))
         return True
 
 
@@ -123,8 +429,9 @@ class ForeignAidHandler(ActionHandler):
     """外援处理器"""
 
     def execute(self, gm: 'GameManager', actor: 'Player', choice: Dict) -> bool:
-        actor.get_coin(2)
-        print(f"{actor.name}执行外援，获得2金币")
+        gm.adjust_coins(actor, 2)
+        if gm.bus:
+            gm.bus.publish(CoinsGained(actor, 2, ActionType.FOREIGN_AID))
         return True
 
 
@@ -132,8 +439,9 @@ class TaxHandler(ActionHandler):
     """税收处理器"""
 
     def execute(self, gm: 'GameManager', actor: 'Player', choice: Dict) -> bool:
-        actor.get_coin(3)
-        print(f"{actor.name}执行税收，获得3金币")
+        gm.adjust_coins(actor, 3)
+        if gm.bus:
+            gm.bus.publish(CoinsGained(actor, 3, ActionType.TAX))
         return True
 
 
@@ -146,9 +454,10 @@ class StealHandler(ActionHandler):
             return False
 
         stolen = min(2, target.coins)
-        target.lose_coin(stolen)
-        actor.get_coin(stolen)
-        print(f"{actor.name}从{target.name}偷窃了{stolen}金币")
+        gm.adjust_coins(target, -stolen)
+        gm.adjust_coins(actor, stolen)
+        if gm.bus:
+            gm.bus.publish(CoinsStolen(actor, target, stolen))
         return True
 
 
@@ -157,12 +466,12 @@ class AssassinateHandler(ActionHandler):
 
     def execute(self, gm: 'GameManager', actor: 'Player', choice: Dict) -> bool:
         target: Player = gm.get_player_by_id(choice["target_id"])
-        print(target)
         if not target:
             return False
 
-        print(f"{actor.name}暗杀{target.name}成功")
-        target.lose_influence()  # 目标失去1影响力
+        if gm.bus:
+            gm.bus.publish(Assassinated(actor, target))
+        gm.reveal_influence(target)  # 目标失去1影响力
         # gm._check_player_death(target)
         return True
 
@@ -175,8 +484,9 @@ class CoupHandler(ActionHandler):
         if not target:
             return False
 
-        print(f"{actor.name}发动政变，目标{target.name}失去1影响力")
-        target.lose_influence()  # 强制翻开一张牌
+        if gm.bus:
+            gm.bus.publish(CoupLaunched(actor, target))
+        gm.reveal_influence(target)  # 强制翻开一张牌
         # gm._check_player_death(target)
         return True
 
@@ -185,43 +495,134 @@ class ExchangeHandler(ActionHandler):
     """交换处理器"""
 
     def execute(self, gm: 'GameManager', actor: 'Player', choice: Dict) -> bool:
-        gm.exchange_two_cards(actor)  # 复用已有方法
-        print(f"{actor.name}完成交换")
+        gm.start_exchange(actor)  # 抽牌后等待玩家选择保留的牌（结算事件在选择后发布）
         return True
 
 
+# 处理器映射表，处理器无状态，所有对局共用同一组实例
+ACTION_HANDLERS: Dict[ActionType, ActionHandler] = {
+    ActionType.INCOME: IncomeHandler(),
+    ActionType.FOREIGN_AID: ForeignAidHandler(),
+    ActionType.TAX: TaxHandler(),
+    ActionType.STEAL: StealHandler(),
+    ActionType.ASSASSINATE: AssassinateHandler(),
+    ActionType.COUP: CoupHandler(),
+    ActionType.EXCHANGE: ExchangeHandler(),
+}
+
+
+# ==================== Zobrist 哈希 ====================
+# 固定种子生成的64位随机键，同一份代码在任何进程里得到相同的键
+#   ZOBRIST_COINS[座位][金币数]
+#   ZOBRIST_HIDDEN / ZOBRIST_REVEALED[座位][角色编码*2 + 第几张同角色]  暗牌/明牌
+#   ZOBRIST_DECK[角色编码][牌堆中该角色张数]
+#   ZOBRIST_SEAT[当前玩家座位]
+# 信息集哈希另外混入回合上下文，这些键只在查询时按 TurnState 的字段取用，不需要增量维护：
+#   ZOBRIST_PHASE[阶段序号]  ZOBRIST_ACTION[行动]  ZOBRIST_CLAIM_ROLE[宣称角色]  ZOBRIST_THEN[后续处理]
+#   ZOBRIST_TURN_SEAT[字段][座位]  目标、宣称者、质疑者、反制者、待翻牌者，字段为空时键为0
+#   ZOBRIST_POLLER[询问顺位][座位]  ZOBRIST_POLL_POS[已询问人数]
+#   ZOBRIST_DRAWN[角色编码*2 + 第几张同角色]  换牌者抽到的牌
+# 牌局哈希是所有成立项的键的异或，GameManager 在每次改动时只异或进/出变化的项
+ZOBRIST_MAX_SEATS = 10
+_zobrist_rng = random.Random(0x5EED_C0DE)
+ZOBRIST_COINS = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(256))  # 与紧凑记录的8位金币一致
+                      for _ in range(ZOBRIST_MAX_SEATS))
+ZOBRIST_HIDDEN = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(2 * len(ROLES)))
+                       for _ in range(ZOBRIST_MAX_SEATS))
+ZOBRIST_REVEALED = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(2 * len(ROLES)))
+                         for _ in range(ZOBRIST_MAX_SEATS))
+ZOBRIST_DECK = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(32)) for _ in ROLES)
+# 牌堆某角色从n张变为n+1张（或反过来）时要异或的值
+ZOBRIST_DECK_STEP = tuple(tuple(keys[n] ^ keys[n + 1] for n in range(len(keys) - 1)) for keys in ZOBRIST_DECK)
+ZOBRIST_SEAT = tuple(_zobrist_rng.getrandbits(64) for _ in range(ZOBRIST_MAX_SEATS))
+ZOBRIST_PHASE = tuple(_zobrist_rng.getrandbits(64) for _ in range(16))
+ZOBRIST_ACTION = {None: 0, **{action: _zobrist_rng.getrandbits(64) for action in ActionType}}
+ZOBRIST_CLAIM_ROLE = {None: 0, **{role: _zobrist_rng.getrandbits(64) for role in ROLES}}
+ZOBRIST_COUNTER_CLAIM = _zobrist_rng.getrandbits(64)
+ZOBRIST_THEN = tuple(_zobrist_rng.getrandbits(64) for _ in range(3))
+ZOBRIST_TURN_SEAT = tuple({None: 0, **{seat: _zobrist_rng.getrandbits(64) for seat in range(ZOBRIST_MAX_SEATS)}}
+                          for _ in range(5))
+ZOBRIST_POLLER = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(ZOBRIST_MAX_SEATS))
+                       for _ in range(ZOBRIST_MAX_SEATS - 1))
+ZOBRIST_POLL_POS = tuple(_zobrist_rng.getrandbits(64) for _ in range(ZOBRIST_MAX_SEATS))
+ZOBRIST_DRAWN = tuple(_zobrist_rng.getrandbits(64) for _ in range(2 * len(ROLES)))
+del _zobrist_rng
+
+
 class Deck:
     """
     牌堆类，用于初始化牌堆，抽牌和接受返回的牌。由抽牌和接受返回的牌构成大使的换牌操作
+    牌堆不记录顺序，只按ROLES顺序记录每种角色剩余几张：
+    抽牌按各角色张数成比例随机抽取，与从洗好的牌堆顶摸牌分布相同；放回只需计数加一，无需重新洗牌
     """
 
-    def __init__(self, i=0):
-        self._cards: List[Role] = [role for role in Role for _ in range(3 + i)]
-        shuffle(self._cards)
+    def __init__(self, i=0, rng: Optional[random.Random] = None):
+        # rng 为所属对局的随机数发生器，保证对局可复现
+        self._rng = rng if rng is not None else random.Random()
+        self._counts = bytearray([3 + i] * len(ROLES))
+        self._total = len(ROLES) * (3 + i)
+        # 牌堆内容的Zobrist哈希，抽牌和放回时增量更新
+        self.zobrist = self._hash_counts()
+
+    def _hash_counts(self) -> int:
+        z = 0
+        for keys, n in zip(ZOBRIST_DECK, self._counts):
+            z ^= keys[n]
+        return z
 
     def draw(self, num: int = 1) -> List[Role]:
-        """从牌堆顶抽牌"""
-        if num > len(self._cards):
+        """从牌堆随机抽牌"""
+        if num > self._total:
             # 牌堆不够时，报错
-            raise ValueError(f"牌堆只剩{len(self._cards)}张，无法抽取{num}张！")
-
-        drawn = [self._cards.pop() for _ in range(num)]
+            raise ValueError(f"牌堆只剩{self._total}张，无法抽取{num}张！")
+
+        counts = self._counts
+        drawn = []
+        for _ in range(num):
+            k = self._rng.randrange(self._total)
+            slot = 0
+            while k >= counts[slot]:
+                k -= counts[slot]
+                slot += 1
+            counts[slot] -= 1
+            self._total -= 1
+            self.zobrist ^= ZOBRIST_DECK_STEP[slot][counts[slot]]
+            drawn.append(ROLES[slot])
         return drawn
 
     def return_cards(self, cards: List[Role]):
         """将牌直接返回牌堆（而非弃牌堆）"""
-        self._cards.extend(cards)  # 直接加回牌堆
-        shuffle(self._cards)  # 保持随机性
+        for card in cards:
+            slot = ROLE_INDEX[card]
+            self.zobrist ^= ZOBRIST_DECK_STEP[slot][self._counts[slot]]
+            self._counts[slot] += 1
+        self._total += len(cards)
 
     def remaining(self) -> int:
-        """返回牌堆剩余牌数（始终等于总牌数）"""
-        return len(self._cards)
+        """返回牌堆剩余牌数"""
+        return self._total
+
+    def count(self, role: Role) -> int:
+        """牌堆中某角色剩余张数"""
+        return self._counts[ROLE_INDEX[role]]
+
+    @property
+    def counts(self) -> bytes:
+        """按ROLES顺序的各角色剩余张数"""
+        return bytes(self._counts)
+
+    def load(self, counts: bytes):
+        """用各角色张数覆盖牌堆内容（快照恢复）"""
+        self._counts[:] = counts
+        self._total = sum(counts)
+        self.zobrist = self._hash_counts()
 
     def __str__(self):
-        return f"牌堆: {len(self._cards)}张\n牌堆全部内容:{self._cards}"
+        content = {role.value: n for role, n in zip(ROLES, self._counts)}
+        return f"牌堆: {self._total}张\n牌堆全部内容:{content}"
 
 
-@dataclass
+@dataclass(slots=True)
 class Influence:
     """单张影响力牌：角色 + 翻开状态"""
     role: Role
@@ -249,7 +650,22 @@ CLASSICAL_NAMES_POOL = [
 ]
 
 
+# ==================== 紧凑玩家记录 ====================
+# 每名玩家可打包为一个16位整数：
+#   bit 0-7   金币数
+#   bit 8-10  第1张牌的角色编码（ROLE_INDEX）
+#   bit 11-13 第2张牌的角色编码
+#   bit 14/15 第1/2张牌是否已翻开
+RECORD_COINS_MASK = 0xFF
+RECORD_ROLE_SHIFTS = (8, 11)
+RECORD_REVEAL_SHIFTS = (14, 15)
+
+
+ACTION_HISTORY_LIMIT = 64  # 每名玩家保留的行动记录条数
+
+
 class Player:
+    __slots__ = ("name", "player_id", "coins", "influence", "alive", "action_history")
 
     def __init__(self, player_name: str, player_id: int, cards: List[Role]):
         self.name = player_name
@@ -273,10 +689,8 @@ class Player:
 
     @property
     def is_alive(self):
-        """通过检查所有牌是否都被翻开判断存活"""
-        self.alive = not all(i.is_reveal for i in self.influence)
-        # print(any(i.is_reveal for i in self.influence))
-        return not all(i.is_reveal for i in self.influence)
+        """是否还有未翻开的牌；alive只在GameManager翻牌和load时更新"""
+        return self.alive
 
     @property
     def hidden_cards(self) -> List[Role]:
@@ -314,12 +728,10 @@ class Player:
         self.influence.extend([Influence(role=card) for card in cards])
         self._log_action("add_influence", {"cards": [c.value for c in cards]})
 
-    def lose_influence(self):
-        """失去影响力（选择牌翻开）"""
-
-        if not self.is_alive:
-            print(f"{self.player_id}号玩家失去所有影响力")
-        return
+    def lose_influence(self) -> Optional[Role]:
+        """失去影响力时选择翻开哪张暗牌，返回其角色（翻开由GameManager完成）"""
+        hidden = self.hidden_cards
+        return hidden[0] if hidden else None
 
     def challenge_or_not(self, pl: 'Player', ro: Role):
         """选择对于其他玩家的某宣言行动是否进行质疑
@@ -367,13 +779,34 @@ class Player:
         return
 
     # ===== 工具方法 =====
+    def pack(self) -> int:
+        """打包为16位紧凑记录（不含名字和ID），格式见 RECORD_* 常量"""
+        if not 0 <= self.coins <= RECORD_COINS_MASK:
+            raise ValueError(f"{self.name}的金币数{self.coins}超出紧凑记录范围")
+        record = self.coins
+        for inf, role_shift, reveal_shift in zip(self.influence, RECORD_ROLE_SHIFTS, RECORD_REVEAL_SHIFTS):
+            record |= ROLE_INDEX[inf.role] << role_shift
+            if inf.is_revealed:
+                record |= 1 << reveal_shift
+        return record
+
+    def load(self, record: int):
+        """用紧凑记录覆盖金币和手牌"""
+        self.coins = record & RECORD_COINS_MASK
+        self.influence = [Influence(ROLES[(record >> rs) & 0b111], bool(record >> vs & 1))
+                          for rs, vs in zip(RECORD_ROLE_SHIFTS, RECORD_REVEAL_SHIFTS)]
+        self.alive = not all(i.is_revealed for i in self.influence)
+
     def _log_action(self, action_type: str, data: Dict[str, Any]):
-        """记录行动日志"""
-        self.action_history.append({
+        """记录行动日志，只保留最近 ACTION_HISTORY_LIMIT 条，长期运行的进程里不会无限增长"""
+        history = self.action_history
+        history.append({
             "type": action_type,
             "data": data,
-            "timestamp": len(self.action_history)
+            "timestamp": history[-1]["timestamp"] + 1 if history else 0
         })
+        if len(history) > ACTION_HISTORY_LIMIT:
+            del history[:len(history) - ACTION_HISTORY_LIMIT]
 
     def __str__(self):
         hidden = len(self.hidden_cards)
@@ -394,6 +827,8 @@ class Player:
 
 
 class HumanPlayer(Player):
+    __slots__ = ()
+
     def __init__(self, player_name: str, player_id: int, cards: List[Role]):
         # 调用父类初始化
         super().__init__(player_name, player_id, cards)
@@ -479,7 +914,7 @@ class HumanPlayer(Player):
     def lose_influence(self):
         # 如果有两张没翻开的牌才需要做选择
         # 只剩一张则直接翻开剩下的一张，并且宣布死亡
-        """人类玩家：交互式选择翻开哪张牌"""
+        """人类玩家：交互式选择翻开哪张牌，返回其角色"""
         hidden_cards = self.get_hidden_cards()
 
         # 如果没有可翻开的牌
@@ -487,14 +922,9 @@ class HumanPlayer(Player):
             print(f"{self.name}没有未翻开的影响力牌")
             return None
 
-        # 如果只有一张，直接翻开
+        # 如果只有一张，直接翻开（GameManager此时不会询问）
         if len(hidden_cards) == 1:
-            card = hidden_cards[0]
-            card.reveal()
-            print(f"{self.name}翻开唯一的影响力牌：{card.role.value}")
-            if not self.is_alive:
-                print(f"{self.player_id}号玩家失去所有影响力")
-            return card.role
+            return hidden_cards[0].role
 
         # 有两张，让玩家选择
         print(f"\n--- {self.name} 需要翻开一张影响力牌 ---")
@@ -506,10 +936,7 @@ class HumanPlayer(Player):
         while True:
             choice = input("请选择要翻开的牌 (1/2): ").strip()
             if choice in ["1", "2"]:
-                selected_card = hidden_cards[int(choice) - 1]
-                selected_card.reveal()
-                print(f"{self.name}选择翻开：{selected_card.role.value}")
-                return selected_card.role
+                return hidden_cards[int(choice) - 1].role
             else:
                 print("无效输入，请输入1或2")
 
@@ -520,7 +947,7 @@ class HumanPlayer(Player):
         while True:
             choice = input("你拥有应对质疑的角色，是否揭开以回应质疑？（1-是/0-否）")
             if choice.isdigit() and int(choice) in [0, 1]:
-                choice = bool(choice)
+                choice = (choice == "1")
                 break
             print("无效输入，请重新选择")
         return choice
@@ -632,7 +1059,32 @@ class HumanPlayer(Player):
 
 
 
+_DEFAULT_PACER = RealTimePacer()
+_DEFAULT_RNG = random.Random()
+
+
 class ComputerPlayer(Player):
+    __slots__ = ("pacer", "rng")
+
+    def __init__(self, player_name: str, player_id: int, cards: List[Role]):
+        super().__init__(player_name, player_id, cards)
+        # 模拟思考时间，由GameManager替换为牌桌统一的节奏控制器
+        self.pacer: Pacer = _DEFAULT_PACER
+        # 决策用的随机数发生器，由GameManager替换为对局自己的发生器
+        # 默认共用模块级发生器，免得每建一名玩家都从系统熵源初始化一个新的
+        self.rng: random.Random = _DEFAULT_RNG
+
+    def join_table(self, gm: 'GameManager', subscribe: bool = True):
+        """入座时由GameManager调用：接入牌桌统一的节奏控制器和对局随机数发生器
+        需要读取牌桌的子类（如搜索型AI）可在此保存gm；subscribe=False 时（克隆出的推演对局）
+        只接入牌桌，不得订阅其事件总线
+        """
+        self.pacer = gm.pacer
+        self.rng = gm.rng
+
+    def _think(self):
+        """模拟CPU思考的停顿"""
+        self.pacer.pause()
 
     def get_player_choice(self, target_list):
         """玩家接受行动菜单和目标列表，返回选择。
@@ -642,18 +1094,15 @@ class ComputerPlayer(Player):
         if not actions:
             raise ValueError("当前玩家没有可用行动")
 
-        selected_action = random.choice(actions)
-        time.sleep(random.uniform(1.0, 4.0))
+        selected_action = self.rng.choice(actions)
+        self._think()
 
         target_id = None
         if ACTION_CONFIG[selected_action].requires_target and target_list:
             # 随机选择目标（可扩展为更智能的AI）
-            target = random.choice(target_list)
+            target = self.rng.choice(target_list)
             target_id = target["player_id"]
 
-        print(f"\n{self.name}(AI) 选择了 {selected_action.value}"
-              f"{f' 目标: {target_id}' if target_id else ''}")
-
         return {
             "action": selected_action,
             "target_id": target_id
@@ -663,8 +1112,8 @@ class ComputerPlayer(Player):
         """选择对于其他玩家的某宣言行动是否进行质疑
         形参需要宣言玩家和所宣言身份
         """
-        re = random.choice([True, False])
-        time.sleep(random.uniform(1.0, 4.0))
+        re = self.rng.choice([True, False])
+        self._think()
         return re
 
     def lose_influence(self):
@@ -672,29 +1121,21 @@ class ComputerPlayer(Player):
 
         # 如果没有可翻开的牌
         if not hidden_cards:
-            print(f"{self.name}没有未翻开的影响力牌")
             return None
 
         # 如果只有一张，直接翻开
         if len(hidden_cards) == 1:
-            card = hidden_cards[0]
-            card.reveal()
-            print(f"{self.name}翻开唯一的影响力牌：{card.role.value}")
-            if not self.is_alive:
-                print(f"{self.player_id}号玩家失去所有影响力")
-            return card.role
-        time.sleep(random.uniform(1.0, 4.0))
+            return hidden_cards[0].role
+        self._think()
         # 随机选择
         # 使用random.random()模拟random.choice
-        selected_card = hidden_cards[int(random.random() * len(hidden_cards))]
-        selected_card.reveal()
-        print(f"{self.name}(AI)随机翻开：{selected_card.role.value}")
+        selected_card = hidden_cards[int(self.rng.random() * len(hidden_cards))]
         return selected_card.role
 
     def deal_challenge(self):
         """返回True为揭牌->质疑失败，False为不揭牌->质疑成功"""
-        time.sleep(random.uniform(1.0, 4.0))
-        re = random.choice([True, False])
+        self._think()
+        re = self.rng.choice([True, False])
         return re
 
     def select_cards_to_keep(self, new_cards: List[Role],
@@ -704,13 +1145,11 @@ class ComputerPlayer(Player):
         CPU玩家：基于权重从所有暗牌中选择保留的牌
         """
         all_cards = new_cards + hidden_cards
-        time.sleep(random.uniform(1.0, 4.0))
+        self._think()
         # 按权重排序，取前keep_count个
         weights = {Role.DUKE: 5, Role.ASSASSIN: 4, Role.CAPTAIN: 3, Role.AMBASSADOR: 2, Role.CONTESSA: 1}
         sorted_cards = sorted(all_cards, key=lambda c: weights[c], reverse=True)
         selected = sorted_cards[:keep_count]
-
-        print(f"{self.name}(AI) 选择保留: {[c.value for c in selected]}")
         return selected
 
 
@@ -733,69 +1172,313 @@ class ComputerPlayer(Player):
 
         # 5. CPU随机选择（使用random()模拟random.choice）
         # 简单AI：60%概率选择最强反制角色，40%概率不反制
-        if random.random() < 0.6 and counter_roles:
+        if self.rng.random() < 0.6 and counter_roles:
             # 选择权重最高的反制角色
             role_weights = {Role.DUKE: 5, Role.ASSASSIN: 4, Role.CAPTAIN: 3, Role.AMBASSADOR: 2, Role.CONTESSA: 1}
             selected = max(counter_roles, key=lambda r: role_weights[r])
         else:
             selected = None
 
-        # 6. 记录决策
-        if selected:
-            print(f"{self.name}(AI) 宣言使用 {selected.value} 反制！")
-        else:
-            print(f"{self.name}(AI) 选择不反制")
-        time.sleep(random.uniform(1.0, 4.0))
+        self._think()
         return selected
 
 
-# GameState类，只负责快照保存和决策记录？
+class PlayerView:
+    """
+    紧凑记录上的只读玩家视图，提供与Player相同的查询接口
+    用于搜索和批量模拟中只保存记录、需要时再按Player的方式读取
+    """
+    __slots__ = ("name", "player_id", "record")
+
+    def __init__(self, record: int, player_id: int, player_name: str = ""):
+        self.record = record
+        self.player_id = player_id
+        self.name = player_name
+
+    @property
+    def coins(self) -> int:
+        return self.record & RECORD_COINS_MASK
+
+    @property
+    def influence(self) -> List[Influence]:
+        return [Influence(ROLES[(self.record >> rs) & 0b111], bool(self.record >> vs & 1))
+                for rs, vs in zip(RECORD_ROLE_SHIFTS, RECORD_REVEAL_SHIFTS)]
+
+    @property
+    def alive(self) -> bool:
+        return not all(self.record >> vs & 1 for vs in RECORD_REVEAL_SHIFTS)
+
+    is_alive = alive
+    hidden_cards = Player.hidden_cards
+    revealed_cards = Player.revealed_cards
+    get_hidden_cards = Player.get_hidden_cards
+    has_role = Player.has_role
+    has_hidden_role = Player.has_hidden_role
+    get_available_actions = Player.get_available_actions
+    display = Player.display
+    __str__ = Player.__str__
+
+
+# ==================== 回合状态机 ====================
+
+class Phase(Enum):
+    """
+    回合状态机的阶段，每个阶段等待 GameManager.decider 提交一种决策：
+        ACTION          当回合玩家 -> {"action": ActionType, "target_id": Optional[int]}
+        CHALLENGE       依次询问的其他玩家 -> bool，是否质疑当前宣称
+        REVEAL_PROOF    被质疑且确有该角色的玩家 -> bool，是否亮牌应对质疑
+        COUNTER         被攻击的目标/依次询问的其他玩家 -> Optional[Role]，宣称的反制角色
+        LOSE_INFLUENCE  需要失去影响力且有多张暗牌的玩家 -> Role，翻开哪张暗牌
+        EXCHANGE        换牌的玩家 -> List[Role]，保留的牌
+        GAME_OVER       游戏结束，不再接受决策
+    RESOLVING 是行动结算中的内部过渡状态，step() 返回时不会停留在该阶段
+    """
+    ACTION = "action"
+    CHALLENGE = "challenge"
+    REVEAL_PROOF = "reveal_proof"
+    COUNTER = "counter"
+    LOSE_INFLUENCE = "lose_influence"
+    EXCHANGE = "exchange"
+    RESOLVING = "resolving"
+    GAME_OVER = "game_over"
+
+    __hash__ = object.__hash__
+
+
+PHASE_INDEX = {phase: idx for idx, phase in enumerate(Phase)}
+
+# 失去影响力之后的后续处理
+THEN_CLAIM_FAILED = 0  # 宣称被识破
+THEN_CLAIM_UPHELD = 1  # 宣称被证实（或无人质疑）
+THEN_RESOLVED = 2  # 行动结算完毕，结束回合
+
+# apply/undo 日志中的增量记录类型
+UNDO_COINS = 0  # (UNDO_COINS, player, 金币变化量)
+UNDO_REVEAL = 1  # (UNDO_REVEAL, player, 翻开的牌, 是否因此出局)
+UNDO_HAND = 2  # (UNDO_HAND, player, 变动前的手牌列表)
+UNDO_DECK = 3  # (UNDO_DECK, 变动前的牌堆计数)
+
+
+class TurnState:
+    """进行中回合的上下文，只记录座位号和角色，不持有玩家对象"""
+    __slots__ = ("action", "target_id", "claimant", "claim_role", "claim_is_counter",
+                 "pollers", "poll_pos", "challenger", "counterer", "loser", "then", "drawn")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, action: Optional[ActionType] = None, target_id: Optional[int] = None):
+        self.action = action
+        self.target_id = target_id
+        self.claimant: Optional[int] = None  # 当前被质疑询问的宣称者
+        self.claim_role: Optional[Role] = None
+        self.claim_is_counter: bool = False  # 宣称的是行动角色还是反制角色
+        self.pollers: tuple = ()  # 依次询问的座位号
+        self.poll_pos: int = 0
+        self.challenger: Optional[int] = None
+        self.counterer: Optional[int] = None
+        self.loser: Optional[int] = None  # 等待选择翻牌的玩家
+        self.then: int = THEN_RESOLVED
+        self.drawn: tuple = ()  # 大使换牌抽到的新牌
+
+    def pack(self) -> tuple:
+        """按__slots__顺序导出全部字段（均为不可变值）"""
+        return (self.action, self.target_id, self.claimant, self.claim_role, self.claim_is_counter,
+                self.pollers, self.poll_pos, self.challenger, self.counterer, self.loser,
+                self.then, self.drawn)
+
+    def load(self, fields: tuple):
+        (self.action, self.target_id, self.claimant, self.claim_role, self.claim_is_counter,
+         self.pollers, self.poll_pos, self.challenger, self.counterer, self.loser,
+         self.then, self.drawn) = fields
+
+
+class GameState:
+    """
+    牌桌快照：只保存可变的对局数据，不含处理器、名字池、事件总线等静态部件
+        board       pack_state() 的紧凑字节串（当前玩家、牌堆、每名玩家金币和手牌）
+        turn_count  回合计数
+        phase       状态机阶段
+        turn        TurnState.pack() 导出的回合上下文
+        rng_state   对局随机数发生器状态，恢复后后续抽牌和CPU决策与快照时完全一致
+    所有字段都是不可变值，快照可以任意共享，不需要复制；通过 GameManager.restore() 写回
+    """
+    __slots__ = ("board", "turn_count", "phase", "turn", "rng_state")
+
+    def __init__(self, board: bytes, turn_count: int, phase: Phase, turn: tuple, rng_state: tuple):
+        self.board = board
+        self.turn_count = turn_count
+        self.phase = phase
+        self.turn = turn
+        self.rng_state = rng_state
+
+
+# ==================== 分阶段计时 ====================
+
+# 等待决策的各阶段在计时器中的名字
+DECISION_TIMER_NAMES = {
+    Phase.ACTION: "action_choice",
+    Phase.CHALLENGE: "challenge_poll",
+    Phase.REVEAL_PROOF: "deal_challenge",
+    Phase.COUNTER: "counter_poll",
+    Phase.LOSE_INFLUENCE: "lose_influence",
+    Phase.EXCHANGE: "exchange_choice",
+}
+TIMER_BUCKETS = 40  # 直方图第k格统计耗时在[2^(k-1), 2^k)纳秒的次数，最后一格兜底
+
+
+class PhaseTimers:
+    """
+    回合各阶段的耗时统计，每个阶段记录次数、总耗时和按2的幂分桶的直方图
+        action_choice / challenge_poll / deal_challenge / counter_poll / lose_influence / exchange_choice
+                    对应阶段玩家做决策的耗时
+        cost        process_action_cost
+        execute     行动处理器结算
+        step        状态机推进（含cost和execute）
+    同一个实例可以传给多局 GameManager 累加整批数据，也可用 merge() 合并其他进程的结果
+    不传给 GameManager 时没有任何计时开销
+    """
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.totals: Dict[str, int] = {}  # 纳秒
+        self.histograms: Dict[str, List[int]] = {}
+
+    def record(self, name: str, ns: int):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = [0] * TIMER_BUCKETS
+            self.counts[name] = 0
+            self.totals[name] = 0
+        self.counts[name] += 1
+        self.totals[name] += ns
+        hist[min(ns.bit_length(), TIMER_BUCKETS - 1)] += 1
+
+    def merge(self, other: "PhaseTimers") -> "PhaseTimers":
+        for name, hist in other.histograms.items():
+            mine = self.histograms.get(name)
+            if mine is None:
+                self.histograms[name] = list(hist)
+                self.counts[name] = other.counts[name]
+                self.totals[name] = other.totals[name]
+                continue
+            for k, n in enumerate(hist):
+                mine[k] += n
+            self.counts[name] += other.counts[name]
+            self.totals[name] += other.totals[name]
+        return self
+
+    def percentile(self, name: str, q: float) -> float:
+        """由直方图估计的q分位耗时（微秒，取所在桶的上界）"""
+        hist = self.histograms[name]
+        rank = q * self.counts[name]
+        seen = 0
+        for k, n in enumerate(hist):
+            seen += n
+            if seen >= rank and n:
+                return (1 << k) / 1000
+        return 0.0
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各阶段 {次数, 总耗时秒, 平均微秒, p50/p90/p99微秒}，按总耗时从高到低"""
+        rows = {}
+        for name in sorted(self.totals, key=lambda n: -self.totals[n]):
+            count = self.counts[name]
+            rows[name] = {
+                "count": count,
+                "total_s": self.totals[name] / 1e9,
+                "mean_us": self.totals[name] / count / 1000,
+                "p50_us": self.percentile(name, 0.5),
+                "p90_us": self.percentile(name, 0.9),
+                "p99_us": self.percentile(name, 0.99),
+            }
+        return rows
+
+    def format_summary(self) -> str:
+        lines = [f"{'阶段':<16}{'次数':>10}{'总耗时s':>10}{'平均us':>10}{'p50':>8}{'p90':>8}{'p99':>8}"]
+        for name, r in self.summary().items():
+            lines.append(f"{name:<16}{r['count']:>10}{r['total_s']:>10.3f}{r['mean_us']:>10.2f}"
+                         f"{r['p50_us']:>8.1f}{r['p90_us']:>8.1f}{r['p99_us']:>8.1f}")
+        return "\n".join(lines)
+
+
+def derive_seed(campaign_seed: int, game_index: int) -> int:
+    """由批量模拟的总种子和对局序号派生单局种子
+    与运行在哪个进程、以什么顺序运行无关，任意一局都可单独复现
+    """
+    digest = hashlib.blake2b(f"{campaign_seed}:{game_index}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
 
 # 传入一共需要几个玩家，有几个是人类玩家，自动生成对应的混合了人类玩家和电脑玩家的玩家数组，交给电脑进行处理
+# headless=True 时为无头模拟模式：全部为电脑玩家，无控制台输入输出，也没有模拟思考的停顿
+# seed 为本局随机数种子，发牌、洗牌和CPU决策都只使用本局自己的 rng，相同种子的对局完全一致
+# pacer 控制CPU思考和质疑结算时的停顿，默认有头为真实停顿、无头为零延迟
+# bus 为游戏事件总线，有头模式下自动订阅控制台渲染器
+# cpu_types 为按座次排列的电脑玩家类型（ComputerPlayer或其子类），给定时不再打乱座次，用于对比不同策略
+# timers 为分阶段计时器，默认None不计时
 class GameManager:
-    def __init__(self, pls: int = 3, hpls: int = 1):
+    def __init__(self, pls: int = 3, hpls: int = 1, headless: bool = False,
+                 pacer: Optional[Pacer] = None, bus: Optional[EventBus] = None,
+                 seed: Optional[int] = None, cpu_types: Optional[List[type]] = None,
+                 timers: Optional[PhaseTimers] = None):
         # 玩家怎么配置，场外？
         # self.players: List[Player] = players
         # 场外传要场外生成，还是只传人数吧
+        if headless and hpls:
+            raise ValueError("无头模式只能由电脑玩家组成")
+        if cpu_types is not None and (hpls or len(cpu_types) != pls):
+            raise ValueError("指定电脑玩家类型时须全部为电脑玩家，且每个座位都要指定")
+        self.cpu_types = cpu_types
+        self.timers = timers
+        self.headless = headless
+        self.seed = seed
+        self.rng = random.Random(seed)
+        if pacer is None:
+            pacer = NullPacer() if headless else RealTimePacer()
+        self.pacer = pacer
+        self.bus = bus if bus is not None else EventBus()
+        if not headless:
+            self.bus.subscribe(ConsoleRenderer())
         self.total_player_num = pls
         self.human_player_num = hpls
         self.i = 0
-        while self.total_player_num * 2 >= (3 + self.i) * 5:
+        # 发完手牌后牌堆至少要留2张供大使换牌
+        while self.total_player_num * 2 + 2 > (3 + self.i) * 5:
             self.i = self.i + 2
-        self.deck = Deck(self.i)
+        self.deck = Deck(self.i, self.rng)
         self.players = []
 
-        self.names_pool = CLASSICAL_NAMES_POOL.copy()
         self.initialize_players()
-        human_player = None
-        for player in self.players:
-            if isinstance(player, HumanPlayer):
-                human_player = player
-        print(human_player)
+        self._reset_alive_cache()
+        self._reset_zobrist()
         self.current_player_index = 0  # 记录当前轮到谁
         self.current_player = self.players[0]
         self.turn_count = 1  # 回合计数器
 
-        # 处理器映射字典
-        self._action_handlers: Dict[ActionType, ActionHandler] = {
-            ActionType.INCOME: IncomeHandler(),
-            ActionType.FOREIGN_AID: ForeignAidHandler(),
-            ActionType.TAX: TaxHandler(),
-            ActionType.STEAL: StealHandler(),
-            ActionType.ASSASSINATE: AssassinateHandler(),
-            ActionType.COUP: CoupHandler(),
-            ActionType.EXCHANGE: ExchangeHandler(),
-        }
+        # 处理器映射字典（处理器无状态，所有对局共用）
+        self._action_handlers: Dict[ActionType, ActionHandler] = ACTION_HANDLERS
+
+        # 可撤销决策的日志：apply() 期间指向当前帧，其余时间为None
+        self._journal: Optional[list] = None
+        self._undo_stack: List[list] = []
+
+        # 回合状态机，从第一个玩家的行动阶段开始
+        self.phase: Phase = Phase.ACTION
+        self._turn = TurnState()
+        self._begin_turn()
 
     def initialize_players(self) -> List[Player]:
         # 只输入玩家人数由管理器自动生成对应数量玩家的设置
         if not (3 <= self.total_player_num <= 10):
             raise ValueError("总玩家数应在3到10之间")
-        if not (1 <= self.human_player_num <= self.total_player_num):
-            raise ValueError("人类玩家数不能大于总玩家数或小于1")
+        if not (0 <= self.human_player_num <= self.total_player_num):
+            raise ValueError("人类玩家数不能大于总玩家数或小于0")
 
         # 清空玩家列表
         self.players = []
+        # 名字池只在建局时使用，不随对局保留
+        names_pool = CLASSICAL_NAMES_POOL.copy()
 
         for idx in range(self.human_player_num):
             initial_cards = self.deck.draw(2)
@@ -813,11 +1496,11 @@ class GameManager:
                         break
                     print("名字不能为空")
                 elif choice == "2":
-                    if not self.names_pool:
+                    if not names_pool:
                         print("⚠️  名字池已空，请自己输入名字")
                         continue
-                    name = random.choice(self.names_pool)
-                    self.names_pool.remove(name)
+                    name = self.rng.choice(names_pool)
+                    names_pool.remove(name)
                     print(f"随机分配名字: {name}")
                     break
                 else:
@@ -835,42 +1518,46 @@ class GameManager:
             initial_cards = self.deck.draw(2)
 
             # CPU从名字池随机选择
-            if self.names_pool:
-                cpu_name = random.choice(self.names_pool)
-                self.names_pool.remove(cpu_name)
+            if names_pool:
+                cpu_name = self.rng.choice(names_pool)
+                names_pool.remove(cpu_name)
             else:
                 cpu_name = f"CPU_{idx + 1}"  # 名字池空时的备用方案
 
-            player = ComputerPlayer(
+            player_type = self.cpu_types[idx] if self.cpu_types else ComputerPlayer
+            player = player_type(
                 #player_name=f"CPU_{idx + 1}",
                 player_name=cpu_name,
                 player_id=idx,
                 cards=initial_cards
             )
+            player.join_table(self)
             self.players.append(player)
 
-        # 洗牌玩家顺序（交错排列）
-        shuffle(self.players)
+        # 洗牌玩家顺序（交错排列），指定了座次时保持原样
+        if not self.cpu_types:
+            self.rng.shuffle(self.players)
 
         # 重新分配ID保证连续
         for idx, player in enumerate(self.players):
             player.player_id = idx
+        self._index_players()
 
-        # 打印创建结果
-        print(f"\n=== 玩家创建完成===")
-        for p in self.players:
-            type_str = "人类" if isinstance(p, HumanPlayer) else "电脑"
-            print(f"玩家 {p.player_id}: ({type_str}) - 手牌: {len(p.influence)}张")
-        print()
+        if self.bus:
+            self.bus.publish(PlayersSeated(list(self.players), 3 + self.i))
         return self.players
 
+    def _index_players(self):
+        """重建 player_id -> Player 的直接索引表，座次或ID变化后必须调用"""
+        table: List[Optional[Player]] = [None] * self.total_player_num
+        for p in self.players:
+            table[p.player_id] = p
+        self._players_by_id = table
+
     def get_player_by_id(self, pid: int) -> Player:
         if not (0 <= pid <self.total_player_num):
             raise IndexError("id号超出范围")
-        p = next((p for p in self.players if p.player_id == pid),
-                 None  # 默认值，找不到时返回
-                 )
-        return p
+        return self._players_by_id[pid]
 
     def get_current_player(self) -> Optional[Player]:
         """
@@ -880,7 +1567,10 @@ class GameManager:
         t_index: int = (self.current_player_index + 1) % self.total_player_num
         # print(f"t_index:{t_index}")
         # print(self.players[t_index])
-        while not self.players[t_index].is_alive:
+        if not self._alive_count:
+            return None
+        alive_flags = self._alive_flags
+        while not alive_flags[t_index]:
             t_index: int = (t_index + 1) % self.total_player_num
         self.current_player_index = t_index
         return self.players[t_index]
@@ -893,102 +1583,91 @@ class GameManager:
         # 1. 验证玩家有未翻开的牌
         hidden_cards = player.get_hidden_cards()
         if not hidden_cards:
-            print(f"{player.name}没有未翻开的牌，无法换牌")
+            if self.bus:
+                self.bus.publish(Notice(f"{player.name}没有未翻开的牌，无法换牌"))
             return False
 
         # 2. 验证玩家有这张特定角色的未翻开牌
         target_card = next((card for card in hidden_cards if card.role == role_to_return), None)
         if not target_card:
-            print(f"{player.name}没有未翻开的{role_to_return.value}牌")
+            if self.bus:
+                self.bus.publish(Notice(f"{player.name}没有未翻开的{role_to_return.value}牌"))
             return False
 
         # 3. 移除这张牌并放回牌堆
+        if self._journal is not None:
+            self._record_hand(player)
+            self._record_deck()
         player.influence.remove(target_card)
         self.deck.return_cards([role_to_return])
-        print(f"{player.name}放回了一张{role_to_return.value}牌")
 
         # 4. 从牌堆抽一张新牌
         new_card = self.deck.draw(1)[0]
         player.influence.append(Influence(new_card))
-        print(f"{player.name}抽到了一张{new_card.value}牌")
+        self.rehash_hand(player)
+        if self.bus:
+            self.bus.publish(CardSwapped(player, role_to_return, new_card))
 
         return True
 
-    def exchange_two_cards(self, player: Player) -> bool:
-        """
-        大使换牌：从牌堆抽2张牌，玩家从所有暗牌（原有+新抽）中选择保留数量张
+    def start_exchange(self, player: Player):
+        """大使换牌第一步：从牌堆抽2张新牌，进入EXCHANGE阶段等待玩家选择保留的牌"""
+        if not player.alive:
+            raise ValueError(f"{player.name}没有暗牌，无法使用大使能力")
+        if self._journal is not None:
+            self._record_deck()
+        self._turn.drawn = tuple(self.deck.draw(2))
+        self.phase = Phase.EXCHANGE
 
-        流程：
-        1. 获取玩家当前暗牌数量（keep_count）
-        2. 从牌堆抽2张新牌
-        3. 调用玩家方法，从所有暗牌（原有+新抽）中选择keep_count张保留
-        4. 计算未选择的2张牌并放回牌堆
+    def _apply_exchange(self, player: Player, new_cards: List[Role], selected: List[Role]):
+        """
+        大使换牌第二步：用选中的牌替换玩家全部暗牌，未选中的放回牌堆
+        selected 必须是（原有暗牌+新牌）中取出的、与原暗牌数量相同的若干张
         """
-        # 1. 获取玩家暗牌和保留数量
         hidden_cards = player.get_hidden_cards()  # 原有暗牌
         keep_count = len(hidden_cards)  # 必须保留这么多张
-
-        if keep_count == 0:
-            raise ValueError(f"{player.name}没有暗牌，无法使用大使能力")
-
-        # 2. 从牌堆抽2张新牌
-        new_cards = self.deck.draw(2)
-        print(f"\n🃏 牌堆提供的新牌: {[c.value for c in new_cards]}")
-
-        # 3. 调用玩家方法进行选择（多态调用）
-        # 传递：新牌列表、原有暗牌角色列表、保留数量
-        selected = player.select_cards_to_keep(
-            new_cards=new_cards,
-            hidden_cards=[inf.role for inf in hidden_cards],
-            keep_count=keep_count
-        )
-
-        # 4. 验证选择数量正确
         if len(selected) != keep_count:
             raise ValueError(f"玩家必须选择{keep_count}张牌，但只选择了{len(selected)}张")
 
-        # 5. 执行换牌逻辑
-        # 5.1 移除所有原有暗牌
+        # 按多重集合逐张扣除，避免重复角色被一并剔除，剩下的（一定是2张）放回牌堆
+        return_cards = list(new_cards) + [inf.role for inf in hidden_cards]
+        for c in selected:
+            if c not in return_cards:
+                raise ValueError(f"不能保留不在手中的牌: {c.value}")
+            return_cards.remove(c)
+
+        # 移除所有原有暗牌，添加选中的牌（暗置）
+        if self._journal is not None:
+            self._record_hand(player)
+            self._record_deck()
         for card in hidden_cards:
             player.influence.remove(card)
-
-        # 5.2 添加选中的牌（暗置）
         player.influence.extend(Influence(c) for c in selected)
+        self.rehash_hand(player)
+        self.deck.return_cards(return_cards)
 
-        # 5.3 计算并返回未选择的牌（一定是2张）
-        all_cards = new_cards + [inf.role for inf in hidden_cards]
-        return_cards = [c for c in all_cards if c not in selected]
-
-        # 5.4 将未选择的牌放回牌堆
-        if return_cards:
-            self.deck.return_cards(return_cards)
-            print(f"🔄 放回牌堆: {[c.value for c in return_cards]}")
+        if self.bus:
+            self.bus.publish(ExchangeCompleted(player, list(new_cards), list(selected), return_cards))
 
-        print(f"✅ 换牌完成！{player.name}现在有 {keep_count} 张暗牌")
+    def exchange_two_cards(self, player: Player) -> bool:
+        """
+        大使换牌（同步版本，直接询问玩家，不经过回合状态机）：
+        从牌堆抽2张牌，玩家从所有暗牌（原有+新抽）中选择保留数量张，未选择的2张放回牌堆
+        """
+        hidden = player.hidden_cards
+        if not hidden:
+            raise ValueError(f"{player.name}没有暗牌，无法使用大使能力")
+        if self._journal is not None:
+            self._record_deck()
+        new_cards = self.deck.draw(2)
+        selected = player.select_cards_to_keep(
+            new_cards=new_cards,
+            hidden_cards=hidden,
+            keep_count=len(hidden)
+        )
+        self._apply_exchange(player, new_cards, selected)
         return True
 
-
-    def deal_challenge(self, pl1: Player, pl2: Player, role: Role):
-        # pl1为被质疑者，pl2为质疑者
-        result = False
-        if not pl1.has_hidden_role(role):
-            # 如果被质疑者没有该角色
-            # 扣除被质疑者（pl1）的影响力
-            time.sleep(random.uniform(1.0, 4.0))
-            pl1.lose_influence()
-            result = True
-        else:
-            if pl1.deal_challenge():
-                # pl1换牌
-                self.exchange_single_card(pl1, role)
-                pl2.lose_influence()
-                result = False
-            else:
-                time.sleep(random.uniform(1.0, 4.0))
-                pl1.lose_influence()
-                result = True
-        return result
-
     def process_action_cost(self, player: Player, action: ActionType) -> tuple[bool, int]:
         """
         处理行动的金币消耗（独立方法，便于区分返还逻辑）
@@ -1015,49 +1694,156 @@ class GameManager:
                 f"{player.name}金币不足：需要{cost}，当前只有{player.coins}"
             )
 
-        # 扣除金币（调用玩家的lose_coin方法）
-        player.lose_coin(cost)
-        print(f"{player.name}消耗了{cost}金币执行{action.value}")
+        # 扣除金币
+        self.adjust_coins(player, -cost)
+        if self.bus:
+            self.bus.publish(CoinsSpent(player, cost, action))
 
         # 返回成功标志和消耗金额（用于后续返还判断）
         return True, cost
 
+    def pack_state(self) -> bytes:
+        """
+        将牌桌打包为紧凑字节串：
+        [当前玩家下标, 牌堆各角色张数×5, 每名玩家2字节记录（小端）...]
+        10人局也只有26字节数据
+        """
+        state = bytearray((self.current_player_index,))
+        state += self.deck.counts
+        for p in self.players:
+            state += p.pack().to_bytes(2, "little")
+        return bytes(state)
+
+    def snapshot(self) -> GameState:
+        """保存当前牌桌的快照，可用 restore() 回到此刻"""
+        return GameState(self.pack_state(), self.turn_count, self.phase,
+                         self._turn.pack(), self.rng.getstate())
+
+    def restore(self, state: GameState, rng: bool = True):
+        """
+        把牌桌整体恢复到快照时的状态（快照须来自同一局或clone出的对局）
+        rng=False 时不回退随机数发生器，反复从同一快照出发的搜索每次能抽到不同的牌
+        """
+        board = state.board
+        n_roles = len(ROLES)
+        offset = 1 + n_roles
+        self.deck.load(board[1:offset])
+        for idx, p in enumerate(self.players):
+            p.load(board[offset + 2 * idx] | board[offset + 2 * idx + 1] << 8)
+        self._reset_alive_cache()
+        self._reset_zobrist()
+        self.current_player_index = board[0]
+        self.current_player = self.players[board[0]]
+        self.turn_count = state.turn_count
+        self.phase = state.phase
+        self._turn.load(state.turn)
+        if rng:
+            self.rng.setstate(state.rng_state)
+        self._undo_stack.clear()
+
+    def clone(self) -> "GameManager":
+        """
+        复制出一局独立的对局用于推演，不发布任何事件、不停顿、不计时（推演不会写进原对局的计时器）
+        处理器、名字池等只读部件与原对局共享，玩家、牌堆和随机数发生器各自独立
+        """
+        other = copy.copy(self)
+        other.bus = EventBus()
+        other.pacer = NullPacer()
+        other.timers = None
+        other.rng = random.Random()
+        other.deck = copy.copy(self.deck)
+        other.deck._counts = bytearray(self.deck._counts)
+        other.deck._rng = other.rng
+        other.players = []
+        for p in self.players:
+            q = copy.copy(p)
+            q.action_history = []
+            # 克隆出的对局只用于推演，玩家改为接入克隆对局但不订阅它的总线
+            if isinstance(q, ComputerPlayer):
+                q.join_table(other, subscribe=False)
+            other.players.append(q)
+        other._index_players()
+        other._turn = TurnState()
+        other._undo_stack = []
+        other.restore(self.snapshot())
+        return other
+
+    def view_state(self, state: bytes) -> List[PlayerView]:
+        """按pack_state的格式读取玩家视图，名字取自本局玩家"""
+        offset = 1 + len(ROLES)
+        return [PlayerView(int.from_bytes(state[offset + 2 * idx: offset + 2 * idx + 2], "little"),
+                           idx, p.name)
+                for idx, p in enumerate(self.players)]
+
     def display_all_players(self):
         for p in self.players:
             Player.display(p)
             # print(p)
         return
 
+    # ===== 存活缓存：只在有牌被翻开时更新 =====
+    def _reset_alive_cache(self):
+        """按玩家当前手牌重建存活缓存（建局或整体覆盖状态后调用）"""
+        self._alive_flags: List[bool] = [p.is_alive for p in self.players]
+        self._alive_players: List[Player] = [p for p in self.players if p.is_alive]
+        self._alive_count: int = len(self._alive_players)
+
+    def _reveal_card(self, player: Player, card: Influence, forced: bool) -> Role:
+        """翻开一张影响力牌并发布事件，若因此出局则同步存活缓存；forced表示只剩这一张"""
+        card.reveal()
+        self.rehash_hand(player)
+        eliminated = all(i.is_revealed for i in player.influence)
+        if eliminated:
+            player.alive = False
+            self._alive_flags[player.player_id] = False
+            self._alive_players.remove(player)
+            self._alive_count -= 1
+        if self._journal is not None:
+            self._journal.append((UNDO_REVEAL, player, card, eliminated))
+        if self.bus:
+            self.bus.publish(InfluenceRevealed(player, card.role, forced))
+            if not player.alive:
+                self.bus.publish(PlayerEliminated(player))
+        return card.role
+
+    def reveal_influence(self, player: Player):
+        """
+        让玩家失去一张影响力（供行动处理器调用）
+        只剩一张暗牌时直接翻开；有多张时进入LOSE_INFLUENCE阶段等待其选择，选择后本回合结束
+        """
+        self._lose(player, THEN_RESOLVED)
+
+    def is_player_alive(self, pid: int) -> bool:
+        """O(1)查询某座位玩家是否存活"""
+        return self._alive_flags[pid]
+
     @property
     def alive_players(self) -> List[Player]:
-        """获取所有存活玩家"""
-        # for p in self.players: print(f"{p.is_alive}")
-        return [p for p in self.players if p.is_alive]
+        """获取所有存活玩家（按座次，缓存列表，调用方不应修改）"""
+        return self._alive_players
 
     def is_game_over(self) -> bool:
         """游戏结束条件：只剩1人存活"""
-        # print(f"存活玩家数:{len(self.alive_players)}")
-        return len(self.alive_players) <= 1
+        return self._alive_count <= 1
 
     def get_target_list(self):
         """跳过当回合玩家，将其他玩家的金币数，暗牌数作为参考，生成对应类型的数据
         返回格式：[{"player_id": int, "name": str, "coins": int, "hidden_cards": int}]
         """
         target_list = []
-        for p in self.players:
+        for p in self._alive_players:
             if p is self.current_player:
                 # print("当回合玩家应从目标列表中剔除")
                 continue
-            if p.is_alive:
-                # 将玩家编号，名字，金币数，暗牌数，加入列表，成为备选
-                # 计算暗牌数量（未翻开的牌）
-                hidden_count = sum(1 for i in p.influence if not i.is_reveal)
-                target_list.append({
-                    "player_id": p.player_id,
-                    "name": p.name,
-                    "coins": p.coins,
-                    "hidden_cards": hidden_count
-                })
+            # 将玩家编号，名字，金币数，暗牌数，加入列表，成为备选
+            # 计算暗牌数量（未翻开的牌）
+            hidden_count = sum(1 for i in p.influence if not i.is_reveal)
+            target_list.append({
+                "player_id": p.player_id,
+                "name": p.name,
+                "coins": p.coins,
+                "hidden_cards": hidden_count
+            })
         return target_list
 
     def execute_action(self, actor: Player, choice: Dict[str, Any]) -> bool:
@@ -1074,197 +1860,488 @@ class GameManager:
         # 委托执行
         return handler.execute(self, actor, choice)
 
-    def run_game(self):
-        # print(self.is_game_over())
-        self.current_player = self.players[0]
-        while not self.is_game_over():
-            # 面向人类玩家，展示所有玩家的存活情况和经济情况
-            # self.current_player = self.players[self.current_player_index]
-            print("="*40)
-            print(f"第{self.turn_count}回合-当前玩家:{self.current_player.name}")
-            self.display_all_players()
-            tl = self.get_target_list()
-            # print(f"tl:{tl}")
-            # get_player_choice
-            # 玩家选择（根据人类玩家和CPU玩家进行不同处理），输入行动列表，输出玩家选择的具体行动
-            choice = self.current_player.get_player_choice(tl)
+    @property
+    def winner(self) -> Optional[Player]:
+        """唯一存活的玩家，游戏未结束时为None"""
+        return self._alive_players[0] if self._alive_count == 1 else None
+
+    @property
+    def turns_played(self) -> int:
+        """已经开始的回合数（与发布过的 TurnStarted 个数相同）；结束时 turn_count 已经多加了1"""
+        return self.turn_count - 1 if self.phase is Phase.GAME_OVER else self.turn_count
+
+    # ===== Zobrist 哈希：所有改动金币、手牌、牌堆的地方都增量维护 =====
+    # 公开部分（金币、明牌）和每名玩家的暗牌分开存放，便于按某名玩家的视角取信息集哈希
+
+    def _hand_keys(self, player: Player) -> tuple:
+        """一名玩家手牌的 (明牌键, 暗牌键)；同状态的同角色第二张牌用另一个键，避免异或抵消"""
+        pid = player.player_id
+        hidden_keys = ZOBRIST_HIDDEN[pid]
+        revealed_keys = ZOBRIST_REVEALED[pid]
+        pub = hid = 0
+        last_pub = last_hid = -1
+        for inf in player.influence:
+            r = ROLE_INDEX[inf.role]
+            if inf.is_revealed:
+                pub ^= revealed_keys[2 * r + (r == last_pub)]
+                last_pub = r
+            else:
+                hid ^= hidden_keys[2 * r + (r == last_hid)]
+                last_hid = r
+        return pub, hid
+
+    def _reset_zobrist(self):
+        """按当前牌桌重新计算全部哈希分量（建局或整体覆盖状态后调用）"""
+        public = 0
+        self._zobrist_hand_pub: List[int] = []
+        self._zobrist_hidden: List[int] = []
+        hidden_all = 0
+        for p in self.players:
+            pub, hid = self._hand_keys(p)
+            public ^= ZOBRIST_COINS[p.player_id][p.coins] ^ pub
+            self._zobrist_hand_pub.append(pub)
+            self._zobrist_hidden.append(hid)
+            hidden_all ^= hid
+        self._zobrist_public = public
+        self._zobrist_hidden_all = hidden_all
+
+    def rehash_hand(self, player: Player):
+        """玩家手牌变动后更新哈希；外部直接改写手牌（如确定化采样）后也须调用"""
+        pid = player.player_id
+        pub, hid = self._hand_keys(player)
+        self._zobrist_public ^= self._zobrist_hand_pub[pid] ^ pub
+        self._zobrist_hand_pub[pid] = pub
+        self._zobrist_hidden_all ^= self._zobrist_hidden[pid] ^ hid
+        self._zobrist_hidden[pid] = hid
+
+    @property
+    def zobrist(self) -> int:
+        """整个牌桌的64位哈希：金币、明牌、每人暗牌、牌堆各角色张数、当前玩家座位"""
+        return (self._zobrist_public ^ self._zobrist_hidden_all ^ self.deck.zobrist
+                ^ ZOBRIST_SEAT[self.current_player_index])
+
+    def info_zobrist(self, pid: int) -> int:
+        """
+        pid 视角的信息集哈希：公开部分（金币、明牌、当前座位、阶段与回合上下文）加上他自己的暗牌，
+        pid 正在换牌时还包括抽到的牌；不含回合数，不同回合走到同一局面时哈希相同
+        全部由固定种子的Zobrist键异或而成，跨进程、跨运行稳定；回合上下文的键在查询时按字段查表
+        """
+        t = self._turn
+        seat_keys = ZOBRIST_TURN_SEAT
+        z = (self._zobrist_public ^ self._zobrist_hidden[pid] ^ ZOBRIST_SEAT[self.current_player_index]
+             ^ ZOBRIST_PHASE[PHASE_INDEX[self.phase]] ^ ZOBRIST_ACTION[t.action]
+             ^ ZOBRIST_CLAIM_ROLE[t.claim_role] ^ ZOBRIST_THEN[t.then] ^ ZOBRIST_POLL_POS[t.poll_pos]
+             ^ seat_keys[0][t.target_id] ^ seat_keys[1][t.claimant] ^ seat_keys[2][t.challenger]
+             ^ seat_keys[3][t.counterer] ^ seat_keys[4][t.loser])
+        if t.claim_is_counter:
+            z ^= ZOBRIST_COUNTER_CLAIM
+        for pos, seat in enumerate(t.pollers):
+            z ^= ZOBRIST_POLLER[pos][seat]
+        if t.drawn and self.current_player_index == pid:
+            last = -1
+            for r in sorted(ROLE_INDEX[role] for role in t.drawn):
+                z ^= ZOBRIST_DRAWN[2 * r + (r == last)]
+                last = r
+        return z
+
+    # ==================== 回合状态机 ====================
+    # 一个回合被拆成若干等待决策的阶段（见Phase）：
+    #   decider           当前需要做决策的玩家
+    #   legal_decisions() 当前阶段所有合法决策
+    #   step(decision)    提交决策并推进到下一个需要决策的阶段
+    # run_game 只是用玩家自己的决策方法驱动 step 的阻塞循环，
+    # 异步服务、搜索或批量模拟可以不经过 run_game 直接驱动任意多局
+
+    @property
+    def decider(self) -> Optional[Player]:
+        """当前需要做决策的玩家"""
+        phase = self.phase
+        t = self._turn
+        if phase is Phase.ACTION or phase is Phase.EXCHANGE:
+            return self.current_player
+        if phase is Phase.CHALLENGE or phase is Phase.COUNTER:
+            return self.players[t.pollers[t.poll_pos]]
+        if phase is Phase.REVEAL_PROOF:
+            return self.players[t.claimant]
+        if phase is Phase.LOSE_INFLUENCE:
+            return self.players[t.loser]
+        return None
+
+    def legal_decisions(self) -> List[Any]:
+        """当前阶段所有合法的决策，格式见Phase"""
+        phase = self.phase
+        t = self._turn
+        if phase is Phase.ACTION:
+            actor = self.current_player
+            targets = [p.player_id for p in self._alive_players if p is not actor]
+            decisions = []
+            for action in actor.get_available_actions():
+                if ACTION_CONFIG[action].requires_target:
+                    decisions.extend({"action": action, "target_id": tid} for tid in targets)
+                else:
+                    decisions.append({"action": action, "target_id": None})
+            return decisions
+        if phase is Phase.CHALLENGE:
+            return [False, True]
+        if phase is Phase.REVEAL_PROOF:
+            return [True, False]
+        if phase is Phase.COUNTER:
+            return [None] + list(ACTION_CONFIG[t.action].counterable_by)
+        if phase is Phase.LOSE_INFLUENCE:
+            return list(dict.fromkeys(self.players[t.loser].hidden_cards))
+        if phase is Phase.EXCHANGE:
+            hidden = self.current_player.hidden_cards
+            pool = sorted(list(t.drawn) + hidden, key=ROLE_INDEX.get)
+            return [list(c) for c in dict.fromkeys(combinations(pool, len(hidden)))]
+        return []
+
+    def step(self, decision: Any):
+        """提交当前决策者的决策，推进到下一个需要决策的阶段或游戏结束"""
+        phase = self.phase
+        if phase is Phase.ACTION:
+            self._on_action(decision)
+        elif phase is Phase.CHALLENGE:
+            self._on_challenge(bool(decision))
+        elif phase is Phase.COUNTER:
+            self._on_counter(decision)
+        elif phase is Phase.REVEAL_PROOF:
+            self._on_reveal_proof(bool(decision))
+        elif phase is Phase.LOSE_INFLUENCE:
+            self._on_lose_influence(decision)
+        elif phase is Phase.EXCHANGE:
+            self._on_exchange(decision)
+        else:
+            raise ValueError("游戏已结束，不再接受决策")
+
+    def ask_decider(self) -> Any:
+        """调用当前决策者自己的决策方法（人类玩家会阻塞等待输入）"""
+        player = self.decider
+        phase = self.phase
+        t = self._turn
+        if phase is Phase.ACTION:
+            choice = player.get_player_choice(self.get_target_list())
             if choice is None:
                 raise ValueError("玩家选择不能为空")
-            print(f"玩家{self.current_player.name}选择进行{choice['action']}"
-                  + (f"，行动目标为{choice['target_id']}号玩家" if choice['target_id'] is not None else ""))
-            # choice格式 {"action": selected_action,"target_id": target_id}
-            # if选择的行动有所属角色的宣称
-            if ACTION_CONFIG[choice["action"]].required_role:
-                challenger = None
-                # 此处询问顺序需要修改
-                for offset in range(1, self.total_player_num + 1):
-                    # 计算目标索引，使用模运算实现循环
-                    idx = (self.current_player_index + offset) % self.total_player_num
-                    p = self.players[idx]
-
-                    if p is self.current_player:
-                        continue
-                    elif not p.is_alive:
-                        continue
-                    else:
-                        # action_challenge
-                        # 依次询问其他玩家是否选择质疑，返回bool。
-                        # 质疑具有唯一性，按序询问，但仅有一人可以质疑
-                        if p.challenge_or_not(
-                                self.current_player,
-                                ACTION_CONFIG[choice["action"]].required_role):
-                            challenger = p
-                            break
-                print(f"质疑者：{challenger}")
-                if challenger:
-                    # 处理质疑结果，输入质疑者，被质疑者，质疑角色，输出质疑成功或失败
-                    # （同时在该函数内自动完成质疑失败的换牌）
-                    result = self.deal_challenge(
-                        self.current_player, challenger,
-                        ACTION_CONFIG[choice["action"]].required_role)
-                    # 如果质疑成功则会直接跳至下回合(先索引轮转再continue)
-                    if result:
-                        self.current_player = self.get_current_player()
-                        self.turn_count = self.turn_count + 1
-                        continue
+            return choice
+        if phase is Phase.CHALLENGE:
+            return player.challenge_or_not(self.players[t.claimant], t.claim_role)
+        if phase is Phase.REVEAL_PROOF:
+            return player.deal_challenge()
+        if phase is Phase.COUNTER:
+            return player.target_answer(t.action)
+        if phase is Phase.LOSE_INFLUENCE:
+            return player.lose_influence()
+        if phase is Phase.EXCHANGE:
+            hidden = player.hidden_cards
+            return player.select_cards_to_keep(
+                new_cards=list(t.drawn),
+                hidden_cards=hidden,
+                keep_count=len(hidden)
+            )
+        raise ValueError("游戏已结束，没有需要决策的玩家")
 
-            # 到这步该回合玩家没有被质疑，则行动的花销被正常支付（如刺杀的3个金币）
-            # 好像只有刺杀花金币还会被反制
-            self.process_action_cost(self.current_player, choice["action"])
-
-
-            # if选择的行动有目标对象 and 存在对目标的反制角色
-            if choice["target_id"] and ACTION_CONFIG[choice["action"]].counterable_by:
-                '''
-                target_player: Player = next(
-                    (p for p in self.players if p.player_id == choice["target_id"]),
-                    None ) # 默认值，找不到时返回
-                '''
-                target_player = self.get_player_by_id(choice["target_id"])
-                print(target_player)
-                target_choice = target_player.target_answer(choice["action"])
-                # 询问目标玩家是否宣称有反制角色（如果有多个反制角色要宣称使用具体某一个）
-                # 该方法返回None(即不反制)或宣称使用的反制角色(Role)
-
-                if target_choice:
-                    co_challenger = None
-                    # 此处询问顺序需要修改
-                    for offset in range(1, self.total_player_num + 1):
-                        # 计算目标索引，使用模运算实现循环
-                        idx = (target_player.player_id + offset) % self.total_player_num
-                        p = self.players[idx]
-
-                        if p is target_player:
-                            continue
-                        elif not p.is_alive:
-                            continue
-                        else:
-                            # action_challenge
-                            # 依次询问其他玩家是否选择质疑，返回bool。
-                            # 质疑具有唯一性，按序询问，但仅有一人可以质疑
-                            if p.challenge_or_not(
-                                    target_player,
-                                    target_choice):
-                                co_challenger: Player = p
-                                break
-
-                    if co_challenger:
-                        # 处理质疑结果，输入质疑者，被质疑者，质疑角色，输出质疑成功或失败
-                        print(f"质疑者：{co_challenger}")
-                        result = self.deal_challenge(
-                            self.current_player, co_challenger,
-                            target_choice)
-                        # 如果质疑失败，即反制成功，行动将不被执行
-                        if not result:
-                            self.current_player = self.get_current_player()
-                            self.turn_count = self.turn_count + 1
-                            continue
-
-                    else:  # 即无人质疑，该反制正常进行，直接跳至下回合
-                        self.current_player = self.get_current_player()
-                        self.turn_count = self.turn_count + 1
-                        continue
+    def run_game(self):
+        """阻塞式运行整局：依次询问决策者并推进状态机，返回获胜者"""
+        timers = self.timers
+        if timers is None:
+            while self.phase is not Phase.GAME_OVER:
+                self.step(self.ask_decider())
+            return self.winner
+
+        clock = time.perf_counter_ns
+        while self.phase is not Phase.GAME_OVER:
+            name = DECISION_TIMER_NAMES[self.phase]
+            t0 = clock()
+            decision = self.ask_decider()
+            t1 = clock()
+            self.step(decision)
+            t2 = clock()
+            timers.record(name, t1 - t0)
+            timers.record("step", t2 - t1)
+        return self.winner
+
+    # ----- 可撤销决策：供搜索在同一局上原地展开和回溯 -----
+    # 每次apply压入一帧：[阶段, 回合上下文, 当前玩家下标, 回合数, 增量记录...]
+    # 增量只记录本次决策真正改动的金币、翻牌、手牌和牌堆，undo按相反顺序逐条撤回
+    # 注意：随机数发生器不回退，撤销后再次apply同一决策可能抽到不同的牌
+
+    def apply(self, decision: Any):
+        """与step相同，但记录增量以便undo；决策非法时自动回滚并抛出异常"""
+        frame = [self.phase, self._turn.pack(), self.current_player_index, self.turn_count]
+        self._undo_stack.append(frame)
+        self._journal = frame
+        try:
+            self.step(decision)
+        except Exception:
+            self._journal = None
+            self.undo()
+            raise
+        self._journal = None
+
+    def undo(self):
+        """撤销最近一次apply"""
+        frame = self._undo_stack.pop()
+        deck = self.deck
+        for idx in range(len(frame) - 1, 3, -1):
+            entry = frame[idx]
+            kind = entry[0]
+            if kind == UNDO_COINS:
+                self.adjust_coins(entry[1], -entry[2])
+            elif kind == UNDO_REVEAL:
+                player, card, eliminated = entry[1], entry[2], entry[3]
+                card.is_revealed = False
+                self.rehash_hand(player)
+                if eliminated:
+                    player.alive = True
+                    pid = player.player_id
+                    self._alive_flags[pid] = True
+                    pos = sum(1 for p in self._alive_players if p.player_id < pid)
+                    self._alive_players.insert(pos, player)
+                    self._alive_count += 1
+            elif kind == UNDO_HAND:
+                entry[1].influence = entry[2]
+                self.rehash_hand(entry[1])
+            else:
+                deck.load(entry[1])
+        self.phase = frame[0]
+        self._turn.load(frame[1])
+        self.current_player_index = frame[2]
+        self.current_player = self.players[frame[2]]
+        self.turn_count = frame[3]
 
-                # 公爵对外援的反制还没做（无目标反制）
-                elif ACTION_CONFIG[choice["action"]].counterable_by:
-                    # 按顺序询问其他玩家是否宣言反制
-                    counter_declared = False
-
-                    for offset in range(1, self.total_player_num + 1):
-                        idx = (self.current_player_index + offset) % self.total_player_num
-                        potential_counter = self.players[idx]
-
-                        if potential_counter is self.current_player:
-                            continue
-                        elif not potential_counter.is_alive:
-                            continue
-                        # 询问该玩家是否宣言反制
-                        counter_choice = potential_counter.target_answer(choice["action"])
-
-                        if counter_choice:
-                            # 有玩家宣言反制，记录并停止询问
-                            counter_declared = True
-                            print(f"{potential_counter.name}宣言使用{counter_choice.value}反制！")
-
-                            # 询问其他玩家是否质疑该反制
-                            co_challenger = None
-                            for offset2 in range(1, self.total_player_num + 1):
-                                idx2 = (self.current_player_index + offset2) % self.total_player_num
-                                p = self.players[idx2]
-
-                                # 跳过反制玩家
-                                if p is potential_counter:
-                                    continue
-                                elif not p.is_alive:
-                                    continue
-
-                                if p.challenge_or_not(potential_counter, counter_choice):
-                                    co_challenger = p
-                                    break
-
-                            if co_challenger:
-                                # 处理质疑
-                                result = self.deal_challenge(
-                                    potential_counter, co_challenger, counter_choice
-                                )
-                                # 如果质疑失败（反制有效），行动不执行
-                                if not result:
-                                    self.current_player = self.get_current_player()
-                                    self.turn_count += 1
-                                    continue
-                                else:
-                                    # 质疑成功（反制无效），继续执行行动
-                                    pass
-                            else:
-                                # 无人质疑，反制有效，行动不执行
-                                self.current_player = self.get_current_player()
-                                self.turn_count += 1
-                                continue
-
-                            # 如果质疑成功则反制无效，继续执行行动
-                            break  # 找到反制者后跳出循环
-
-                # 如果质疑成功则反制无效，行动正常执行
-            # 至此没有跳出，则行动有效，正常执行
+    @property
+    def undo_depth(self) -> int:
+        """可撤销的决策数"""
+        return len(self._undo_stack)
+
+    def adjust_coins(self, player: Player, n: int):
+        """增减玩家金币（n可为负），所有金币变动都经过这里以便undo和更新哈希"""
+        keys = ZOBRIST_COINS[player.player_id]
+        old = player.coins
+        player.coins = old + n
+        self._zobrist_public ^= keys[old] ^ keys[old + n]
+        if self._journal is not None:
+            self._journal.append((UNDO_COINS, player, n))
+
+    def _record_hand(self, player: Player):
+        """手牌列表即将被换牌改动，保存原列表（牌对象本身不变）"""
+        self._journal.append((UNDO_HAND, player, player.influence))
+        player.influence = list(player.influence)
+
+    def _record_deck(self):
+        self._journal.append((UNDO_DECK, self.deck.counts))
+
+    # ----- 回合流转 -----
+    def _begin_turn(self):
+        if self.is_game_over():
+            self.phase = Phase.GAME_OVER
+            if self.bus:
+                self.bus.publish(GameEnded(self.winner))
+            return
+        self.phase = Phase.ACTION
+        self._turn.reset()
+        if self.bus:
+            self.bus.publish(TurnStarted(self.turn_count, self.current_player, self.players))
+
+    def _end_turn(self):
+        # 索引轮转
+        nxt = self.get_current_player()
+        if nxt is not None:
+            self.current_player = nxt
+        self.turn_count = self.turn_count + 1
+        self._begin_turn()
+
+    def _seats_after(self, seat: int) -> tuple:
+        """从seat的下一位开始按座次排列的其他存活玩家座位号"""
+        n = self.total_player_num
+        flags = self._alive_flags
+        return tuple(s for s in ((seat + k) % n for k in range(1, n)) if flags[s])
+
+    def _on_action(self, choice: Dict[str, Any]):
+        action = choice["action"]
+        target_id = choice.get("target_id")
+        actor = self.current_player
+        if action not in actor.get_available_actions():
+            raise ValueError(f"{actor.name}当前不能执行{action.value}")
+        meta = ACTION_CONFIG[action]
+        if meta.requires_target:
+            if (target_id is None or not 0 <= target_id < self.total_player_num
+                    or target_id == actor.player_id or not self._alive_flags[target_id]):
+                raise ValueError(f"无效的行动目标: {target_id}")
+        else:
+            target_id = None
+
+        self._turn.reset(action, target_id)
+        if self.bus:
+            self.bus.publish(ActionDeclared(actor, action, target_id))
+        # 选择的行动有所属角色的宣称，先依次询问其他玩家是否质疑
+        if meta.required_role:
+            self._start_claim(actor.player_id, meta.required_role, is_counter=False)
+        else:
+            self._after_action_claim()
+
+    def _start_claim(self, claimant: int, role: Role, is_counter: bool):
+        """某玩家宣称角色后，从其下家开始依次询问其他存活玩家是否质疑（仅有一人可以质疑）"""
+        t = self._turn
+        t.claimant = claimant
+        t.claim_role = role
+        t.claim_is_counter = is_counter
+        t.pollers = self._seats_after(claimant)
+        t.poll_pos = 0
+        t.challenger = None
+        if t.pollers:
+            self.phase = Phase.CHALLENGE
+        else:
+            self._claim_resolved(upheld=True)
+
+    def _on_challenge(self, challenge: bool):
+        t = self._turn
+        if not challenge:
+            t.poll_pos += 1
+            if t.poll_pos >= len(t.pollers):
+                # 无人质疑，宣称成立
+                self._claim_resolved(upheld=True)
+            return
+
+        t.challenger = t.pollers[t.poll_pos]
+        claimant = self.players[t.claimant]
+        if self.bus:
+            self.bus.publish(ChallengeDeclared(self.players[t.challenger], claimant, t.claim_role))
+        if claimant.has_hidden_role(t.claim_role):
+            # 被质疑者确有该角色，由其决定是否亮牌
+            self.phase = Phase.REVEAL_PROOF
+        else:
+            self._challenge_succeeded()
+
+    def _on_reveal_proof(self, reveal: bool):
+        t = self._turn
+        if not reveal:
+            self._challenge_succeeded()
+            return
+        # 亮牌应对：该牌放回牌堆换一张新牌，质疑者失去影响力
+        claimant = self.players[t.claimant]
+        challenger = self.players[t.challenger]
+        if self.bus:
+            self.bus.publish(ChallengeResolved(challenger, claimant, t.claim_role, False))
+        self.exchange_single_card(claimant, t.claim_role)
+        self._lose(challenger, THEN_CLAIM_UPHELD)
+
+    def _challenge_succeeded(self):
+        """质疑成功：被质疑者失去影响力，宣称作废"""
+        t = self._turn
+        claimant = self.players[t.claimant]
+        if self.bus:
+            self.bus.publish(ChallengeResolved(self.players[t.challenger], claimant, t.claim_role, True))
+        self.pacer.pause()
+        self._lose(claimant, THEN_CLAIM_FAILED)
+
+    def _claim_resolved(self, upheld: bool):
+        if self._turn.claim_is_counter:
+            # 反制成立则行动不执行；反制被识破则行动照常执行
+            if upheld:
+                self._end_turn()
+            else:
+                self._execute()
+        elif upheld:
+            self._after_action_claim()
+        else:
+            # 行动宣称被识破，直接跳至下回合
+            self._end_turn()
+
+    def _after_action_claim(self):
+        """行动没有被质疑掉：支付花销，再询问反制"""
+        t = self._turn
+        actor = self.current_player
+        meta = ACTION_CONFIG[t.action]
+        if self.timers is None:
+            self.process_action_cost(actor, t.action)
+        else:
+            t0 = time.perf_counter_ns()
+            self.process_action_cost(actor, t.action)
+            self.timers.record("cost", time.perf_counter_ns() - t0)
+
+        if meta.counterable_by:
+            if meta.requires_target:
+                # 有目标的行动只能由目标反制
+                pollers = (t.target_id,) if self._alive_flags[t.target_id] else ()
+            else:
+                # 无目标的行动（外援）按顺序询问其他玩家
+                pollers = self._seats_after(actor.player_id)
+            if pollers:
+                t.pollers = pollers
+                t.poll_pos = 0
+                self.phase = Phase.COUNTER
+                return
+        self._execute()
+
+    def _on_counter(self, role: Optional[Role]):
+        t = self._turn
+        if role is None:
+            t.poll_pos += 1
+            if t.poll_pos >= len(t.pollers):
+                self._execute()
+            return
+        if role not in ACTION_CONFIG[t.action].counterable_by:
+            raise ValueError(f"{role.value}不能反制{t.action.value}")
+        t.counterer = t.pollers[t.poll_pos]
+        if self.bus:
+            self.bus.publish(CounterDeclared(self.players[t.counterer], role, t.action))
+        self._start_claim(t.counterer, role, is_counter=True)
+
+    def _execute(self):
+        """至此行动有效，交给处理器结算；处理器需要玩家选择时会切换到对应阶段"""
+        t = self._turn
+        self.phase = Phase.RESOLVING
+        choice = {"action": t.action, "target_id": t.target_id}
+        if self.timers is None:
             self.execute_action(self.current_player, choice)
-
-            # 索引轮转
-            self.current_player = self.get_current_player()
-            self.turn_count = self.turn_count + 1
-            # break
-        winner = self.alive_players[0] if self.alive_players else None
-        if winner:
-            print(f"\n{'=' * 50}")
-            print(f"🏆 游戏结束！获胜者: {winner.name} (ID:{winner.player_id})")
-            print(f"{'=' * 50}")
         else:
-            print("\n游戏异常结束：没有存活玩家")
-        return
+            t0 = time.perf_counter_ns()
+            self.execute_action(self.current_player, choice)
+            self.timers.record("execute", time.perf_counter_ns() - t0)
+        if self.phase is Phase.RESOLVING:
+            self._end_turn()
+
+    def _lose(self, player: Player, then: int):
+        """玩家失去一张影响力：有多张暗牌时等待其选择，否则直接翻开，之后按then继续"""
+        hidden = player.get_hidden_cards()
+        if len(hidden) > 1:
+            self._turn.loser = player.player_id
+            self._turn.then = then
+            self.phase = Phase.LOSE_INFLUENCE
+            return
+        if hidden:
+            self._reveal_card(player, hidden[0], forced=True)
+        self._resume(then)
+
+    def _on_lose_influence(self, role: Role):
+        t = self._turn
+        player = self.players[t.loser]
+        card = next((c for c in player.influence if c.role == role and not c.is_revealed), None)
+        if card is None:
+            raise ValueError(f"{player.name}没有可翻开的{getattr(role, 'value', role)}")
+        self._reveal_card(player, card, forced=False)
+        self._resume(t.then)
+
+    def _on_exchange(self, selected: List[Role]):
+        t = self._turn
+        self._apply_exchange(self.current_player, t.drawn, list(selected))
+        t.drawn = ()
+        self._resume(THEN_RESOLVED)
+
+    def _resume(self, then: int):
+        if then == THEN_CLAIM_FAILED:
+            self._claim_resolved(upheld=False)
+        elif then == THEN_CLAIM_UPHELD:
+            self._claim_resolved(upheld=True)
+        else:
+            self._end_turn()
 
 
 if __name__ == '__main__':
-    gm = GameManager(4, 1)
-    gm.run_game()
+    # python -m coup_basic {play,simulate,bench,replay} ...：子命令都在 coup_cli 中，整局在那里导入的引擎模块里运行
+    from coup_cli import main
+    main()
 
 
     '''
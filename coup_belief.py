@@ -0,0 +1,246 @@
+"""
+对手暗牌的增量贝叶斯信念：为每名玩家维护其暗牌组合（HAND_COMBOS 中的下标）上的概率分布
+订阅事件总线，宣称、反制、质疑结算、翻牌、亮牌换牌和大使换牌各自只对相关玩家的分布做一次
+O(组合数) 的乘法或转移，不回放历史；查询直接读取每次更新后缓存好的分布和各角色边缘概率
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from coup_basic import (ACTION_CONFIG, ROLE_INDEX, ActionDeclared, CardSwapped, ChallengeResolved,
+                        CounterDeclared, EventBus, ExchangeCompleted, InfluenceRevealed, Player,
+                        PlayersSeated, Role)
+from coup_sampler import COMBO_INDEX, HAND_COMBOS, N_ROLES, combo_ways
+
+# CONTAINS[k][r]    k张组合中含角色r的组合下标
+# REMOVE[k][c][r]   k张组合c去掉一张r后在k-1张组合中的下标，不含r时为-1
+# ADD[k][c][r]      k张组合c加上一张r后在k+1张组合中的下标
+CONTAINS = tuple(tuple(tuple(c for c, combo in enumerate(combos) if r in combo) for r in range(N_ROLES))
+                 for combos in HAND_COMBOS)
+REMOVE = tuple(tuple(tuple(COMBO_INDEX[k - 1][combo[:combo.index(r)] + combo[combo.index(r) + 1:]]
+                           if r in combo else -1 for r in range(N_ROLES))
+                     for combo in combos) if k else ()
+               for k, combos in enumerate(HAND_COMBOS))
+ADD = tuple(tuple(tuple(COMBO_INDEX[k + 1][tuple(sorted(combo + (r,)))] for r in range(N_ROLES))
+                  for combo in combos) if k + 1 < len(HAND_COMBOS) else ()
+            for k, combos in enumerate(HAND_COMBOS))
+# 组合个数 -> 暗牌张数
+COMBO_SIZE = {len(combos): k for k, combos in enumerate(HAND_COMBOS)}
+
+
+@dataclass
+class BeliefModel:
+    """
+    对手行为的似然参数（相对于"持有该角色"时为1）：
+        bluff    不持有某角色时仍宣称它（行动或反制）的相对概率
+        decline  持有被质疑的角色时放弃亮牌的相对概率
+    bluff=1、decline=1 表示宣称和亮牌不携带任何信息（如随机策略的 ComputerPlayer）
+    """
+    bluff: float = 0.3
+    decline: float = 0.1
+
+
+class BeliefTracker:
+    """
+    viewer  观察者；为None时只用公开信息推断所有玩家，否则以该玩家的视角推断其他玩家
+            （他自己的暗牌和亮牌换回的新牌都已知，不计入未知牌）
+    须在创建 GameManager 之前（或在玩家 join_table 时）订阅，才能收到座次和起手牌
+    各玩家的分布彼此独立维护，有牌公开时按未知牌数量的变化同步调整其他玩家的分布
+    """
+
+    def __init__(self, model: Optional[BeliefModel] = None, viewer: Optional[Player] = None):
+        self.model = model if model is not None else BeliefModel()
+        self.viewer = viewer
+        self.pool: List[int] = []  # 观察者看不到的各角色张数
+        self._weights: Dict[int, List[float]] = {}  # 座位号 -> 未归一化的组合权重
+        self._probs: Dict[int, tuple] = {}  # 座位号 -> 归一化的组合分布
+        self._marginals: Dict[int, tuple] = {}  # 座位号 -> 各角色至少持有一张的概率
+
+    def attach(self, bus: EventBus) -> EventBus:
+        bus.subscribe(self._on_seated, PlayersSeated)
+        bus.subscribe(self._on_action, ActionDeclared)
+        bus.subscribe(self._on_counter, CounterDeclared)
+        bus.subscribe(self._on_challenge, ChallengeResolved)
+        bus.subscribe(self._on_swapped, CardSwapped)
+        bus.subscribe(self._on_exchange, ExchangeCompleted)
+        bus.subscribe(self._on_revealed, InfluenceRevealed)
+        return bus
+
+    # ===== 查询（O(1)）=====
+    def distribution(self, pid: int) -> tuple:
+        """该玩家暗牌组合的概率，下标对应 HAND_COMBOS[暗牌数]；观察者本人或已出局时为空"""
+        return self._probs.get(pid, ())
+
+    def role_probability(self, pid: int, role: Role) -> float:
+        """该玩家至少持有一张某角色暗牌的概率"""
+        marginals = self._marginals.get(pid)
+        return marginals[ROLE_INDEX[role]] if marginals else 0.0
+
+    def weights(self, seats: Sequence[int]) -> List[tuple]:
+        """
+        按座位顺序取出各组合的似然比（后验 / 按未知牌张数的先验），可直接作为 HandSampler.sample 的 weights
+        采样器本身已按剩余牌的凑出方式数加权，传入后验会把张数先验计算两次；没有任何观测时全为1
+        按当前未知牌现算，每次 O(组合数)，供每次搜索开始时取一次
+        """
+        out = []
+        for pid in seats:
+            probs = self._probs[pid]
+            prior = self._prior(COMBO_SIZE[len(probs)])
+            total = sum(prior)
+            out.append(tuple(p * total / w if w else 0.0 for p, w in zip(probs, prior)))
+        return out
+
+    # ===== 内部更新 =====
+    def _set(self, pid: int, weights: List[float]):
+        """写入新权重并刷新缓存；权重全为0（观测与模型矛盾）时退回按未知牌的先验"""
+        total = sum(weights)
+        k = COMBO_SIZE[len(weights)]
+        if total <= 0.0:
+            weights = self._prior(k)
+            total = sum(weights)
+        self._weights[pid] = weights
+        probs = tuple(w / total for w in weights)
+        self._probs[pid] = probs
+        contains = CONTAINS[k]
+        self._marginals[pid] = tuple(sum(probs[c] for c in contains[r]) for r in range(N_ROLES))
+
+    def _prior(self, k: int) -> List[float]:
+        return [float(combo_ways(self.pool, k, c)) for c in range(len(HAND_COMBOS[k]))]
+
+    def _k(self, pid: int) -> int:
+        return COMBO_SIZE[len(self._weights[pid])]
+
+    def _scale_role(self, pid: int, r: int, has: float, lacks: float):
+        """似然更新：含角色r的组合乘has，不含的乘lacks"""
+        weights = self._weights[pid]
+        contains = CONTAINS[self._k(pid)][r]
+        new = [w * lacks for w in weights]
+        for c in contains:
+            new[c] = weights[c] * has
+        self._set(pid, new)
+
+    def _drop_role(self, pid: int, r: int):
+        """该玩家的一张r离开暗牌：按含r的组合取条件，再转移到少一张的组合上"""
+        k = self._k(pid)
+        if k == 1:
+            self._weights.pop(pid, None)
+            self._probs.pop(pid, None)
+            self._marginals.pop(pid, None)
+            return
+        weights = self._weights[pid]
+        new = [0.0] * len(HAND_COMBOS[k - 1])
+        for c in CONTAINS[k][r]:
+            new[REMOVE[k][c][r]] += weights[c]
+        self._set(pid, new)
+
+    def _shift_pool(self, delta: Sequence[int], skip: Optional[int] = None):
+        """
+        观察者看不到的牌发生变化：其他玩家的组合先验按凑出方式数的比例调整
+        （已知为0的组合保持为0）
+        """
+        old = self.pool
+        new = [a + d for a, d in zip(old, delta)]
+        self.pool = new
+        for pid, weights in list(self._weights.items()):
+            if pid == skip:
+                continue
+            k = self._k(pid)
+            scaled = []
+            for c, w in enumerate(weights):
+                before = combo_ways(old, k, c)
+                scaled.append(w * combo_ways(new, k, c) / before if before else 0.0)
+            self._set(pid, scaled)
+
+    # ===== 事件处理 =====
+    def _on_seated(self, e: PlayersSeated):
+        viewer = self.viewer
+        self.bind([p.player_id for p in e.players], e.copies,
+                  [inf.role for inf in viewer.influence] if viewer is not None else ())
+
+    def bind(self, seats: Sequence[int], copies: int, own_cards: Sequence[Role] = ()):
+        """
+        按座位初始化全部分布：未知牌为全部牌（每种角色copies张）减去观察者的手牌，每人的分布为其先验
+        copies 取自 PlayersSeated，与牌桌实际发的牌一致
+        """
+        self._weights.clear()
+        self._probs.clear()
+        self._marginals.clear()
+        self.pool = [copies] * N_ROLES
+        for role in own_cards:
+            self.pool[ROLE_INDEX[role]] -= 1
+        viewer_id = self.viewer.player_id if self.viewer is not None else None
+        prior = self._prior(2)
+        for pid in seats:
+            if pid != viewer_id:
+                self._set(pid, list(prior))
+
+    def _claim(self, pid: int, role: Role):
+        if pid in self._weights:
+            self._scale_role(pid, ROLE_INDEX[role], 1.0, self.model.bluff)
+
+    def _on_action(self, e: ActionDeclared):
+        role = ACTION_CONFIG[e.action].required_role
+        if role is not None:
+            self._claim(e.actor.player_id, role)
+
+    def _on_counter(self, e: CounterDeclared):
+        self._claim(e.player.player_id, e.role)
+
+    def _on_challenge(self, e: ChallengeResolved):
+        pid = e.claimant.player_id
+        if pid not in self._weights:
+            return
+        if e.succeeded:
+            # 没有亮牌：要么没有该角色，要么有但放弃亮牌
+            self._scale_role(pid, ROLE_INDEX[e.role], self.model.decline, 1.0)
+        else:
+            self._scale_role(pid, ROLE_INDEX[e.role], 1.0, 0.0)
+
+    def _on_swapped(self, e: CardSwapped):
+        pid = e.player.player_id
+        r = ROLE_INDEX[e.returned]
+        if pid not in self._weights:
+            if self.viewer is not None and pid == self.viewer.player_id:
+                # 观察者自己换牌：放回的牌重新变为未知，抽到的新牌变为已知
+                delta = [0] * N_ROLES
+                delta[r] += 1
+                delta[ROLE_INDEX[e.drawn]] -= 1
+                self._shift_pool(delta)
+            return
+        # 亮出的牌回到牌堆，再从未知牌中抽一张：O(组合数 × 角色数) 的转移
+        k = self._k(pid)
+        weights = self._weights[pid]
+        pool = self.pool
+        total = sum(pool)
+        new = [0.0] * len(weights)
+        for c in CONTAINS[k][r]:
+            rest = REMOVE[k][c][r]
+            w = weights[c]
+            for x in range(N_ROLES):
+                if pool[x]:
+                    new[ADD[k - 1][rest][x]] += w * pool[x] / total
+        self._set(pid, new)
+
+    def _on_exchange(self, e: ExchangeCompleted):
+        pid = e.player.player_id
+        if pid in self._weights:
+            # 换牌的玩家可以任意保留，之前对他手牌的推断作废，回到先验
+            self._set(pid, self._prior(self._k(pid)))
+        elif self.viewer is not None and pid == self.viewer.player_id:
+            # 观察者自己换牌：放回的牌变为未知，保留下来的新牌变为已知
+            delta = [0] * N_ROLES
+            for role in e.returned:
+                delta[ROLE_INDEX[role]] += 1
+            for role in e.drawn:
+                delta[ROLE_INDEX[role]] -= 1
+            self._shift_pool(delta)
+
+    def _on_revealed(self, e: InfluenceRevealed):
+        pid = e.player.player_id
+        r = ROLE_INDEX[e.role]
+        if self.viewer is not None and pid == self.viewer.player_id:
+            return  # 观察者自己的牌本来就已知
+        if pid in self._weights:
+            self._drop_role(pid, r)
+        delta = [0] * N_ROLES
+        delta[r] -= 1
+        self._shift_pool(delta, skip=pid)
@@ -0,0 +1,269 @@
+"""
+性能基准：整局吞吐量和关键操作的单次耗时，可保存为JSON基线并与之对比
+用法:
+    python coup_bench.py                      运行全部基准并打印
+    python coup_bench.py --save base.json     保存为基线
+    python coup_bench.py --compare base.json  与基线对比，退步超过阈值时返回码为1
+    python coup_bench.py --memory 100000      内存占用基准，常驻内存随局数增长时返回码为1
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+from coup_basic import ActionType, GameManager, Phase, derive_seed
+from coup_cli import positive_int
+
+BENCH_SEED = 20240601  # 基准对局的总种子，保证每次跑的是同一批对局
+PLAYER_COUNTS = (3, 6, 10)
+
+
+def _best_of(fn: Callable[[], None], number: int, repeat: int) -> float:
+    """重复repeat轮、每轮调用number次，取最快一轮的单次耗时（秒），减少系统噪声"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _metric(value: float, unit: str, higher_is_better: bool) -> Dict[str, object]:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def bench_throughput(games: int, pls: int, repeat: int = 3) -> Dict[str, Dict[str, object]]:
+    """固定种子的同一批对局，测每秒局数和每秒回合数（取最快一轮）"""
+    seeds = [derive_seed(BENCH_SEED, idx) for idx in range(games)]
+    best = float("inf")
+    turns = 0
+    for _ in range(repeat):
+        turns = 0
+        start = time.perf_counter()
+        for seed in seeds:
+            gm = GameManager(pls, 0, headless=True, seed=seed)
+            gm.run_game()
+            turns += gm.turns_played
+        best = min(best, time.perf_counter() - start)
+    return {
+        f"games_per_sec.{pls}p": _metric(games / best, "局/秒", True),
+        f"turns_per_sec.{pls}p": _metric(turns / best, "回合/秒", True),
+    }
+
+
+def _bench_table(pls: int = 6) -> GameManager:
+    """给操作基准用的固定牌桌：每人金币足够执行任何行动"""
+    gm = GameManager(pls, 0, headless=True, seed=BENCH_SEED)
+    for p in gm.players:
+        p.coins = 9
+    gm.restore(gm.snapshot())  # 直接改了金币，经快照重建哈希等派生状态
+    return gm
+
+
+# 宣布行动之后各阶段的固定应答：无人质疑、无人反制；翻牌和换牌取第一个合法决策
+QUIET_REPLIES = {Phase.CHALLENGE: False, Phase.COUNTER: None}
+
+
+def bench_actions(number: int, repeat: int) -> Dict[str, Dict[str, object]]:
+    """
+    每种行动从宣布到结算完毕的单次耗时：经公开的 apply 逐个提交决策（QUIET_REPLIES），
+    回到行动阶段后按相反顺序 undo，牌桌始终保持同一状态；结果包含记录和撤销增量的开销
+    """
+    gm = _bench_table()
+    first: Dict[ActionType, dict] = {}
+    for decision in gm.legal_decisions():
+        first.setdefault(decision["action"], decision)
+    results = {}
+    for action, decision in first.items():
+
+        def run():
+            gm.apply(decision)
+            applied = 1
+            while gm.phase is not Phase.ACTION and gm.phase is not Phase.GAME_OVER:
+                phase = gm.phase
+                gm.apply(QUIET_REPLIES[phase] if phase in QUIET_REPLIES else gm.legal_decisions()[0])
+                applied += 1
+            for _ in range(applied):
+                gm.undo()
+
+        results[f"action.{action.value}"] = _metric(_best_of(run, number, repeat) * 1e6, "微秒", False)
+    return results
+
+
+def bench_operations(number: int, repeat: int) -> Dict[str, Dict[str, object]]:
+    """牌堆、目标列表、快照/恢复/克隆、信息集哈希的单次耗时"""
+    gm = _bench_table()
+    deck = gm.deck
+    state = gm.snapshot()
+
+    decision = {"action": ActionType.INCOME, "target_id": None}
+
+    def draw_return():
+        deck.return_cards(deck.draw(2))
+
+    def apply_undo():
+        gm.apply(decision)
+        gm.undo()
+
+    ops = {
+        "deck.draw_return_2": draw_return,
+        "get_target_list": gm.get_target_list,
+        "snapshot": gm.snapshot,
+        "restore": lambda: gm.restore(state),
+        "clone": gm.clone,
+        "apply_undo": apply_undo,
+        "info_zobrist": lambda: gm.info_zobrist(0),
+    }
+    results = {}
+    for name, fn in ops.items():
+        n = max(1, number // 10) if name == "clone" else number
+        results[name] = _metric(_best_of(fn, n, repeat) * 1e6, "微秒", False)
+    return results
+
+
+def bench_memory(games: int = 100_000, pls: int = 4, samples: int = 10,
+                 live: int = 1000) -> Dict[str, float]:
+    """
+    在tracemalloc下于同一进程连续运行games局，返回：
+        bytes_per_live_game  同时持有live局已结束的对局时，每局占用的内存
+        bytes_per_turn       对局跑完后比刚建好时多占用的内存，按回合平均（应接近0）
+        growth_bytes         预热后到最后一次采样，进程常驻内存的增长量
+        growth_per_game      常驻内存随局数增长的斜率（最小二乘），泄漏时为正
+    """
+    if games < 1:
+        raise ValueError("内存基准至少需要运行1局")
+    tracemalloc.start()
+    try:
+        # 预热：填满各种缓存后再取基准
+        for idx in range(min(200, games)):
+            GameManager(pls, 0, headless=True, seed=derive_seed(BENCH_SEED, idx)).run_game()
+        gc.collect()
+        base = tracemalloc.get_traced_memory()[0]
+
+        tables = [GameManager(pls, 0, headless=True, seed=derive_seed(BENCH_SEED, idx)) for idx in range(live)]
+        gc.collect()
+        fresh = tracemalloc.get_traced_memory()[0]
+        turns = 0
+        for gm in tables:
+            gm.run_game()
+            turns += gm.turns_played
+        gc.collect()
+        finished = tracemalloc.get_traced_memory()[0]
+        del tables, gm
+        gc.collect()
+
+        points = []
+        step = max(1, games // samples)
+        for idx in range(games):
+            GameManager(pls, 0, headless=True, seed=derive_seed(BENCH_SEED, idx)).run_game()
+            if (idx + 1) % step == 0:
+                gc.collect()
+                points.append((idx + 1, tracemalloc.get_traced_memory()[0] - base))
+    finally:
+        tracemalloc.stop()
+
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x if var_x else 0.0
+    return {
+        "games": games,
+        "bytes_per_live_game": (finished - base) / live,
+        "bytes_per_turn": (finished - fresh) / turns,
+        "growth_bytes": points[-1][1] - points[0][1],
+        "growth_per_game": slope,
+    }
+
+
+def run_suite(games: int = 300, number: int = 2000, repeat: int = 5) -> Dict[str, object]:
+    """运行全部基准，返回可直接写入JSON的结果"""
+    metrics: Dict[str, Dict[str, object]] = {}
+    for pls in PLAYER_COUNTS:
+        metrics.update(bench_throughput(games, pls))
+    metrics.update(bench_actions(number, repeat))
+    metrics.update(bench_operations(number, repeat))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "games": games,
+            "number": number,
+            "repeat": repeat,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "metrics": metrics,
+    }
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object], threshold: float = 0.10):
+    """
+    与基线逐项对比，返回[(指标, 基线值, 当前值, 变化比例, 是否退步)]
+    变化比例为正表示变好；退步超过threshold（默认10%）即判为退步
+    """
+    rows = []
+    base_metrics = baseline["metrics"]
+    for name, cur in current["metrics"].items():
+        base = base_metrics.get(name)
+        if base is None or not base["value"]:
+            continue
+        ratio = cur["value"] / base["value"] - 1.0
+        if not cur["higher_is_better"]:
+            ratio = base["value"] / cur["value"] - 1.0 if cur["value"] else float("inf")
+        rows.append((name, base["value"], cur["value"], ratio, ratio < -threshold))
+    return rows
+
+
+def _print_metrics(result: Dict[str, object]):
+    for name, m in result["metrics"].items():
+        print(f"{name:<28}{m['value']:>14,.2f} {m['unit']}")
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="coup 引擎基准")
+    parser.add_argument("--games", type=positive_int, default=300, help="每种人数的吞吐量对局数")
+    parser.add_argument("--number", type=positive_int, default=2000, help="单项操作每轮调用次数")
+    parser.add_argument("--repeat", type=positive_int, default=5, help="单项操作重复轮数（取最快一轮）")
+    parser.add_argument("--save", default=None, help="把结果保存为JSON基线")
+    parser.add_argument("--compare", default=None, help="与该JSON基线对比")
+    parser.add_argument("--threshold", type=float, default=0.10, help="判为退步的变差比例")
+    parser.add_argument("--memory", type=positive_int, default=None, metavar="GAMES",
+                        help="改为运行内存占用基准，连续跑这么多局")
+    parser.add_argument("--growth-limit", type=int, default=64 * 1024,
+                        help="内存基准允许的常驻内存增长（字节）")
+    args = parser.parse_args(argv)
+
+    if args.memory is not None:
+        mem = bench_memory(args.memory)
+        print(f"{mem['games']}局: 每局常驻 {mem['bytes_per_live_game']:,.0f} 字节，"
+              f"每回合新增 {mem['bytes_per_turn']:,.1f} 字节")
+        print(f"常驻内存增长 {mem['growth_bytes']:,} 字节，斜率 {mem['growth_per_game']:.3f} 字节/局")
+        if mem["growth_bytes"] > args.growth_limit:
+            print("常驻内存随局数增长，疑似泄漏!")
+            return 1
+        return 0
+
+    result = run_suite(args.games, args.number, args.repeat)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if not args.compare:
+        _print_metrics(result)
+        return 0
+
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressed = False
+    for name, base, cur, ratio, bad in compare(result, baseline, args.threshold):
+        regressed |= bad
+        print(f"{name:<28}{base:>14,.2f} -> {cur:>14,.2f}  {ratio:+.1%}{'  退步!' if bad else ''}")
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+命令行入口: python -m coup_cli {play,simulate,bench,replay} ...（python -m coup_basic 会转交到这里）
+与引擎模块分开，各子命令只使用正常导入的 coup_basic；模拟和基准模块只在对应子命令中导入
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from coup_basic import GameManager, NullPacer, derive_seed
+
+
+def positive_int(text: str) -> int:
+    """argparse 的类型函数：局数、轮数、进程数等必须至少为1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"应为正整数: {text}")
+    return value
+
+
+def player_count(text: str) -> int:
+    """argparse 的类型函数：总玩家数须在3到10之间，与 GameManager 的限制一致"""
+    value = int(text)
+    if not (3 <= value <= 10):
+        raise argparse.ArgumentTypeError(f"总玩家数应在3到10之间: {text}")
+    return value
+
+
+def _cmd_play(args):
+    GameManager(args.players, args.humans, seed=args.seed).run_game()
+
+
+def _cmd_simulate(args):
+    import time
+    import coup_sim
+
+    t0 = time.perf_counter()
+    if args.stats or args.checkpoint:
+        stats = coup_sim.simulate_stats(args.games, args.players, args.seed, args.workers,
+                                        args.chunk_size, checkpoint=args.checkpoint)
+        elapsed = time.perf_counter() - t0
+        print(stats.format_summary())
+    else:
+        records = coup_sim.simulate_batch(args.games, args.players, args.seed, args.workers, args.chunk_size)
+        elapsed = time.perf_counter() - t0
+        wins = [0] * args.players
+        for r in records:
+            wins[r.winner_id] += 1
+        print("各座位胜率: " + " ".join(f"{seat}:{k / args.games:.1%}" for seat, k in enumerate(wins)))
+    print(f"{args.players}人局 x {args.games}: {args.games / elapsed * 60:,.0f} 局/分钟")
+
+
+def _cmd_bench(args):
+    import coup_bench
+
+    sys.exit(coup_bench.main(args.bench_args))
+
+
+def _cmd_replay(args):
+    # 批量模拟中的第index局使用 derive_seed(总种子, index)，直接给 --game-seed 则重放该种子
+    seed = args.game_seed if args.game_seed is not None else derive_seed(args.seed, args.index)
+    print(f"重放种子: {seed}")
+    GameManager(args.players, 0, seed=seed, pacer=NullPacer()).run_game()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m coup_cli", description="Coup 桌游引擎")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("play", help="在控制台与电脑对战")
+    p.add_argument("--players", type=player_count, default=4, help="总玩家数(3-10)")
+    p.add_argument("--humans", type=int, default=1, help="人类玩家数")
+    p.add_argument("--seed", type=int, default=None, help="本局随机数种子")
+    p.set_defaults(func=_cmd_play)
+
+    p = sub.add_parser("simulate", help="多进程批量运行全电脑无头对局")
+    p.add_argument("--games", type=positive_int, default=10000)
+    p.add_argument("--players", type=player_count, default=4)
+    p.add_argument("--workers", type=positive_int, default=None, help="进程数，默认CPU核数")
+    p.add_argument("--seed", type=int, default=0, help="总种子")
+    p.add_argument("--chunk-size", type=positive_int, default=None)
+    p.add_argument("--stats", action="store_true", help="输出流式统计汇总")
+    p.add_argument("--checkpoint", default=None, help="进度文件，存在时从中断处继续（隐含--stats）")
+    p.set_defaults(func=_cmd_simulate)
+
+    p = sub.add_parser("bench", help="运行基准套件（其余参数原样交给 coup_bench，如 --save/--compare）",
+                       add_help=False)
+    p.set_defaults(func=_cmd_bench)
+
+    p = sub.add_parser("replay", help="在控制台重放批量模拟中的某一局")
+    p.add_argument("--players", type=player_count, default=4)
+    p.add_argument("--seed", type=int, default=0, help="批量模拟的总种子")
+    p.add_argument("--index", type=int, default=0, help="对局序号")
+    p.add_argument("--game-seed", type=int, default=None, help="直接指定单局种子")
+    p.set_defaults(func=_cmd_replay)
+
+    # bench 的参数由 coup_bench 自己解析
+    args, rest = parser.parse_known_args(argv)
+    if args.func is _cmd_bench:
+        args.bench_args = rest
+    elif rest:
+        parser.error(f"无法识别的参数: {' '.join(rest)}")
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
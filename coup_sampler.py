@@ -0,0 +1,200 @@
+"""
+确定化采样：从某名玩家的视角，把他看不到的牌（对手暗牌+牌堆）重新分配成一个与公开信息一致的完整牌局
+未知牌按各角色张数记录，对手暗牌按"手牌组合"（与顺序无关的角色多重集合）逐人抽取：
+组合被抽中的概率正比于 (信念权重 × 剩余未知牌中凑出该组合的方式数)，每次抽取都直接命中，不需要拒绝重抽
+batch_sample 用 NumPy 一次生成成批的确定化，NumPy 只在调用时导入
+"""
+from itertools import combinations_with_replacement
+from typing import List, Optional, Sequence, Tuple
+
+from coup_basic import ROLE_INDEX, ROLES, GameManager, Role
+
+N_ROLES = len(ROLES)
+
+# HAND_COMBOS[k] 为k张暗牌的全部组合，每个组合是按ROLES顺序排好的角色编码元组
+# 1张5种，2张15种；信念权重和批量采样结果都按这里的下标编号
+HAND_COMBOS: Tuple[Tuple[Tuple[int, ...], ...], ...] = tuple(
+    tuple(combinations_with_replacement(range(N_ROLES), k)) for k in range(3))
+COMBO_INDEX = tuple({combo: idx for idx, combo in enumerate(combos)} for combos in HAND_COMBOS)
+# COMBO_REPEATS[k][c][p] 组合c中第p张牌之前有几张同角色的牌
+# 剩余n_r张r角色时凑出该组合的方式数 = Π_p (n[角色p] - 重复数p) / (重复数p + 1) = Π_r C(n_r, 该组合中r的张数)
+COMBO_REPEATS = tuple(tuple(tuple(combo[:p].count(r) for p, r in enumerate(combo)) for combo in combos)
+                      for combos in HAND_COMBOS)
+
+
+def combo_of(roles: Sequence[Role]) -> int:
+    """一手暗牌在 HAND_COMBOS[len(roles)] 中的下标"""
+    return COMBO_INDEX[len(roles)][tuple(sorted(ROLE_INDEX[r] for r in roles))]
+
+
+def combo_ways(pool: Sequence[int], k: int, c: int) -> int:
+    """从各角色张数为pool的未知牌中，凑出组合c的方式数"""
+    ways = 1
+    for r, rep in zip(HAND_COMBOS[k][c], COMBO_REPEATS[k][c]):
+        ways = ways * (pool[r] - rep) // (rep + 1)
+    return ways
+
+
+class HandSampler:
+    """
+    某名玩家视角下的确定化采样器
+        pool    未知牌各角色张数（按ROLES顺序），即对手暗牌与牌堆的合计
+        seats   需要分配暗牌的对手座位号
+        sizes   这些对手各自的暗牌张数
+    权重 weights 可选，为每名对手一个长度等于 len(HAND_COMBOS[该对手暗牌数]) 的序列，
+    表示各组合的相对似然（不含张数先验，如 BeliefTracker.weights 给出的似然比）；
+    对手按座次依次在"前面的对手已经抽走的牌之外"抽取，权重全为1时与整体洗牌分配的分布完全相同
+    """
+    __slots__ = ("pool", "seats", "sizes", "total")
+
+    def __init__(self, pool: Sequence[int], seats: Sequence[int], sizes: Sequence[int]):
+        if len(seats) != len(sizes):
+            raise ValueError("对手座位和暗牌数的个数不一致")
+        self.pool = tuple(pool)
+        self.seats = tuple(seats)
+        self.sizes = tuple(sizes)
+        self.total = sum(self.pool)
+        if sum(self.sizes) > self.total:
+            raise ValueError("未知牌不够分配给对手")
+
+    @classmethod
+    def for_player(cls, gm: GameManager, player_id: int) -> "HandSampler":
+        """
+        从牌桌上player_id的视角建立采样器：
+        全部牌减去自己的暗牌、所有明牌和自己换牌时抽到的牌，剩下的就是未知牌
+        """
+        counts = [3 + gm.i] * N_ROLES
+        seats = []
+        sizes = []
+        for p in gm.players:
+            hidden = 0
+            for inf in p.influence:
+                if inf.is_revealed or p.player_id == player_id:
+                    counts[ROLE_INDEX[inf.role]] -= 1
+                else:
+                    hidden += 1
+            if hidden:
+                seats.append(p.player_id)
+                sizes.append(hidden)
+        if gm.current_player.player_id == player_id:
+            for role in gm._turn.drawn:
+                counts[ROLE_INDEX[role]] -= 1
+        return cls(counts, seats, sizes)
+
+    # ===== 单次采样 =====
+    def sample(self, rng, weights: Optional[Sequence[Sequence[float]]] = None
+               ) -> Tuple[List[Tuple[int, ...]], bytearray]:
+        """
+        抽取一个确定化，返回 (每名对手暗牌的角色编码元组, 牌堆各角色张数)
+        rng 为 random.Random
+        """
+        counts = bytearray(self.pool)
+        total = self.total
+        rand = rng.random
+        hands = []
+        if weights is None:
+            # 无偏时逐张按剩余张数成比例抽取，等价于洗牌后依次发牌
+            for k in self.sizes:
+                hand = []
+                for _ in range(k):
+                    x = int(rand() * total)
+                    r = 0
+                    while x >= counts[r]:
+                        x -= counts[r]
+                        r += 1
+                    counts[r] -= 1
+                    total -= 1
+                    hand.append(r)
+                hands.append(tuple(hand))
+            return hands, counts
+
+        for k, w in zip(self.sizes, weights):
+            combos = HAND_COMBOS[k]
+            repeats = COMBO_REPEATS[k]
+            scores = []
+            acc = 0.0
+            for c, combo in enumerate(combos):
+                ways = 1
+                for r, rep in zip(combo, repeats[c]):
+                    ways = ways * (counts[r] - rep) // (rep + 1)
+                acc += w[c] * ways
+                scores.append(acc)
+            if acc <= 0.0:
+                # 信念与剩余的牌矛盾（权重全落在凑不出的组合上），退回按方式数抽取
+                acc = 0.0
+                scores = []
+                for c in range(len(combos)):
+                    acc += combo_ways(counts, k, c)
+                    scores.append(acc)
+            x = rand() * acc
+            c = 0
+            while scores[c] <= x:
+                c += 1
+            combo = combos[c]
+            for r in combo:
+                counts[r] -= 1
+            hands.append(combo)
+        return hands, counts
+
+    def apply(self, gm: GameManager, hands: Sequence[Sequence[int]], deck: Sequence[int]):
+        """把一个确定化写入牌桌：依次覆盖各对手暗牌的角色，再用剩余的牌作为牌堆"""
+        players = gm.players
+        for seat, hand in zip(self.seats, hands):
+            player = players[seat]
+            pos = 0
+            for inf in player.influence:
+                if not inf.is_revealed:
+                    inf.role = ROLES[hand[pos]]
+                    pos += 1
+            gm.rehash_hand(player)
+        gm.deck.load(deck)
+
+    # ===== 批量采样 =====
+    def batch_sample(self, n: int, seed: Optional[int] = None,
+                     weights: Optional[Sequence[Sequence[float]]] = None, chunk: int = 1 << 15):
+        """
+        一次抽取n个确定化，返回两个NumPy数组：
+            combos  (n, 对手数) 每名对手暗牌组合在 HAND_COMBOS[暗牌数] 中的下标
+            deck    (n, 5) 牌堆各角色张数
+        与 sample 的分布相同（含信念权重和权重矛盾时的退回规则）；按chunk行分块计算，中间数组留在缓存里
+        """
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        # 每名对手的查表数据：组合各位置的角色、之前的同角色张数、方式数的公共分母（并入权重）和各角色张数
+        tables = []
+        for j, k in enumerate(self.sizes):
+            combos = np.array(HAND_COMBOS[k], dtype=np.intp).reshape(-1, k)
+            repeats = np.array(COMBO_REPEATS[k], dtype=np.int32).reshape(-1, k)
+            scale = 1.0 / np.prod(repeats + 1, axis=1)
+            if weights is not None:
+                scale = scale * np.asarray(weights[j], dtype=np.float64)
+            counts = np.zeros((len(combos), N_ROLES), dtype=np.int32)
+            for p in range(k):
+                counts[np.arange(len(combos)), combos[:, p]] += 1
+            tables.append((combos, repeats, scale, counts))
+
+        out = np.empty((n, len(self.sizes)), dtype=np.int8)
+        deck = np.empty((n, N_ROLES), dtype=np.uint8)
+        pool = np.array(self.pool, dtype=np.int32)
+        for lo in range(0, n, chunk):
+            m = min(chunk, n - lo)
+            remaining = np.tile(pool, (m, 1))
+            for j, (combos, repeats, scale, counts) in enumerate(tables):
+                # ways[i, c] = 第i个样本当前剩余牌中凑出组合c的方式数 × 公共分母
+                ways = remaining[:, combos[:, 0]]
+                for p in range(1, combos.shape[1]):
+                    ways = ways * (remaining[:, combos[:, p]] - repeats[:, p])
+                scores = ways * scale
+                cum = np.cumsum(scores, axis=1)
+                if weights is not None:
+                    dead = cum[:, -1] <= 0.0
+                    if dead.any():
+                        base = ways[dead] / np.prod(repeats + 1, axis=1)
+                        cum[dead] = np.cumsum(base, axis=1)
+                x = rng.random(m) * cum[:, -1]
+                pick = (cum <= x[:, None]).sum(axis=1)
+                out[lo:lo + m, j] = pick
+                remaining -= counts[pick]
+            deck[lo:lo + m] = remaining
+        return out, deck
@@ -0,0 +1,272 @@
+"""
+批量模拟：把大量全电脑无头对局分摊到多个进程
+用法: python coup_sim.py [局数] [玩家数] [进程数] [总种子]
+"""
+import os
+import pickle
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from coup_basic import ActionType, EventBus, GameManager, Phase, derive_seed
+from coup_stats import CampaignStats
+
+CHECKPOINT_VERSION = 1
+
+# 共享内存结果记录：获胜座位号(int8，无人获胜为-1)、回合数(uint16)、按ACTIONS顺序的各行动次数(uint16)
+ACTIONS = tuple(ActionType)
+ACTION_INDEX = {action: idx for idx, action in enumerate(ACTIONS)}
+RESULT_RECORD = struct.Struct("<bxH" + "H" * len(ACTIONS))
+
+
+class GameRecord(NamedTuple):
+    """单局结果的紧凑记录，只含整数，进程间传输开销很小"""
+    index: int  # 对局序号
+    seed: int  # 本局种子，derive_seed(总种子, 序号)
+    players: int  # 玩家数
+    winner_id: int  # 获胜者座位号
+    turns: int  # 进行的回合数
+    winner_coins: int  # 获胜者剩余金币
+
+
+def play_one(pls: int, campaign_seed: int, index: int, bus: Optional[EventBus] = None) -> GameRecord:
+    """运行批量中的第index局，结果只取决于(总种子, 序号)，与运行在哪个进程无关"""
+    seed = derive_seed(campaign_seed, index)
+    gm = GameManager(pls, 0, headless=True, seed=seed, bus=bus)
+    winner = gm.run_game()
+    return GameRecord(index, seed, pls, winner.player_id, gm.turns_played, winner.coins)
+
+
+def _run_chunk(pls: int, campaign_seed: int, start: int, stop: int) -> List[tuple]:
+    """工作进程的任务单元：连续运行[start, stop)局，按普通元组返回"""
+    return [tuple(play_one(pls, campaign_seed, idx)) for idx in range(start, stop)]
+
+
+def _stats_chunk(pls: int, campaign_seed: int, start: int, stop: int) -> CampaignStats:
+    """工作进程的任务单元：连续运行[start, stop)局，只返回累加好的统计"""
+    stats = CampaignStats()
+    bus = stats.attach(EventBus())
+    for idx in range(start, stop):
+        play_one(pls, campaign_seed, idx, bus)
+    return stats
+
+
+def _chunks(start: int, stop: int, size: int) -> Iterator[tuple]:
+    for lo in range(start, stop, size):
+        yield lo, min(lo + size, stop)
+
+
+def _map_chunks(worker: Callable[..., Any], args: tuple, start: int, stop: int,
+                workers: Optional[int] = None, chunk_size: Optional[int] = None) -> Iterator[Tuple[int, Any]]:
+    """
+    把第[start, stop)局分块，以 worker(*args, lo, hi) 运行每块，按提交顺序产出 (hi, 返回值)
+    workers 为进程数，默认CPU核数；为1时直接在当前进程运行，不启动进程池
+    chunk_size 为每次提交给进程池的局数，默认让每个进程分到约8块，兼顾负载均衡和通信开销
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if stop <= start:
+        return
+    if chunk_size is None:
+        chunk_size = max(1, min(1000, (stop - start) // (workers * 8)))
+
+    if workers == 1:
+        for lo, hi in _chunks(start, stop, chunk_size):
+            yield hi, worker(*args, lo, hi)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(hi, pool.submit(worker, *args, lo, hi)) for lo, hi in _chunks(start, stop, chunk_size)]
+        for hi, future in futures:
+            yield hi, future.result()
+
+
+def iter_batch(games: int, pls: int = 4, campaign_seed: int = 0,
+               workers: Optional[int] = None, chunk_size: Optional[int] = None,
+               start: int = 0) -> Iterator[List[GameRecord]]:
+    """
+    按块产出第[start, games)局的结果，块按提交顺序产出，块内按序号排列
+    workers、chunk_size 的含义见 _map_chunks
+    """
+    if not (3 <= pls <= 10):
+        raise ValueError("总玩家数应在3到10之间")
+    for _, chunk in _map_chunks(_run_chunk, (pls, campaign_seed), start, games, workers, chunk_size):
+        yield [GameRecord(*r) for r in chunk]
+
+
+def simulate_batch(games: int, pls: int = 4, campaign_seed: int = 0,
+                   workers: Optional[int] = None, chunk_size: Optional[int] = None) -> List[GameRecord]:
+    """运行games局全电脑无头对局，返回按序号排列的结果记录"""
+    records: List[GameRecord] = []
+    for chunk in iter_batch(games, pls, campaign_seed, workers, chunk_size):
+        records.extend(chunk)
+    records.sort(key=lambda r: r.index)
+    return records
+
+
+def save_checkpoint(path: str, pls: int, campaign_seed: int, completed: int, stats: CampaignStats):
+    """
+    原子地写入进度：先写临时文件再替换，中途被杀也不会留下半个文件
+    每局种子只由(总种子, 序号)决定，所以已完成局数就是随机数流的全部位置信息
+    """
+    state = {"version": CHECKPOINT_VERSION, "pls": pls, "campaign_seed": campaign_seed,
+             "completed": completed, "stats": stats}
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str, pls: int, campaign_seed: int) -> Tuple[int, CampaignStats]:
+    """读取进度，返回(已完成局数, 统计)；文件不存在时从头开始"""
+    if not os.path.exists(path):
+        return 0, CampaignStats()
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"不支持的进度文件版本: {state.get('version')}")
+    if state["pls"] != pls or state["campaign_seed"] != campaign_seed:
+        raise ValueError(f"进度文件属于{state['pls']}人局、总种子{state['campaign_seed']}的模拟，与本次参数不符")
+    return state["completed"], state["stats"]
+
+
+def simulate_stats(games: int, pls: int = 4, campaign_seed: int = 0,
+                   workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                   progress: Optional[Callable[[CampaignStats], None]] = None,
+                   checkpoint: Optional[str] = None, checkpoint_interval: float = 60.0) -> CampaignStats:
+    """
+    运行games局并只收集流式统计（不保留逐局记录），各进程的累加器在主进程合并
+    progress 在每块合并后以当前的汇总累加器调用，可用于中途导出
+    checkpoint 为进度文件路径：存在时从中记录的局数继续，运行中每隔checkpoint_interval秒
+    及结束时写入；续跑的结果与一次跑完完全相同（分块大小和进程数可以不同）
+    """
+    if not (3 <= pls <= 10):
+        raise ValueError("总玩家数应在3到10之间")
+    if checkpoint:
+        start, total = load_checkpoint(checkpoint, pls, campaign_seed)
+    else:
+        start, total = 0, CampaignStats()
+    saved_at = time.monotonic()
+    # 块按序号顺序合并，已完成的始终是从0开始的连续前缀
+    for hi, part in _map_chunks(_stats_chunk, (pls, campaign_seed), start, games, workers, chunk_size):
+        total.merge(part)
+        if checkpoint and (hi == games or time.monotonic() - saved_at >= checkpoint_interval):
+            save_checkpoint(checkpoint, pls, campaign_seed, hi, total)
+            saved_at = time.monotonic()
+        if progress:
+            progress(total)
+    return total
+
+
+class SharedResultSink:
+    """
+    以 multiprocessing.shared_memory 预分配的定长结果缓冲区，第i局写在第i条记录
+    工作进程按序号直接写入自己那一段，主进程原地读取汇总，结果不经过pickle
+    用完须 close()（创建者还会unlink），也可以用 with 语句
+    """
+
+    def __init__(self, games: int, name: Optional[str] = None):
+        self.games = games
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, games * RESULT_RECORD.size))
+        else:
+            # 工作进程与父进程共用同一个资源跟踪器，只有创建者负责unlink
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, index: int, winner_seat: int, turns: int, action_counts: List[int]):
+        RESULT_RECORD.pack_into(self.shm.buf, index * RESULT_RECORD.size, winner_seat, turns, *action_counts)
+
+    def records(self) -> List[tuple]:
+        """
+        读出全部 (获胜座位号, 回合数, 行动次数...)，直接从共享缓冲区解析，不先复制整段字节
+        返回前释放缓冲区视图，不会妨碍之后 close()
+        """
+        with self.shm.buf[:self.games * RESULT_RECORD.size] as view:
+            return list(RESULT_RECORD.iter_unpack(view))
+
+    def aggregate(self, pls: int) -> Tuple[List[int], int, List[int]]:
+        """汇总为 (各座位胜局数, 总回合数, 各行动总次数)"""
+        wins = [0] * pls
+        turns = 0
+        actions = [0] * len(ACTIONS)
+        for winner, t, *counts in self.records():
+            if winner >= 0:
+                wins[winner] += 1
+            turns += t
+            for k, c in enumerate(counts):
+                actions[k] += c
+        return wins, turns, actions
+
+    def close(self):
+        # 即使close失败（如外部仍持有缓冲区视图）也要unlink，避免共享内存段泄漏
+        try:
+            self.shm.close()
+        finally:
+            if self.owner:
+                self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _sink_chunk(name: str, games: int, pls: int, campaign_seed: int, start: int, stop: int) -> int:
+    """工作进程的任务单元：把[start, stop)局的结果写进共享缓冲区，只返回完成的局数"""
+    sink = SharedResultSink(games, name)
+    try:
+        for idx in range(start, stop):
+            gm = GameManager(pls, 0, headless=True, seed=derive_seed(campaign_seed, idx))
+            counts = [0] * len(ACTIONS)
+            # 手动驱动状态机，顺便统计行动，不需要订阅事件
+            while gm.phase is not Phase.GAME_OVER:
+                decision = gm.ask_decider()
+                if gm.phase is Phase.ACTION:
+                    counts[ACTION_INDEX[decision["action"]]] += 1
+                gm.step(decision)
+            winner = gm.winner
+            sink.write(idx, winner.player_id if winner else -1, gm.turns_played, counts)
+    finally:
+        sink.shm.close()
+    return stop - start
+
+
+def simulate_shared(games: int, pls: int = 4, campaign_seed: int = 0,
+                    workers: Optional[int] = None, chunk_size: Optional[int] = None) -> SharedResultSink:
+    """运行games局，结果写入新建的共享内存缓冲区并返回（调用方负责close）"""
+    if not (3 <= pls <= 10):
+        raise ValueError("总玩家数应在3到10之间")
+    sink = SharedResultSink(games)
+    try:
+        for _ in _map_chunks(_sink_chunk, (sink.name, games, pls, campaign_seed), 0, games, workers, chunk_size):
+            pass
+    except BaseException:
+        sink.close()
+        raise
+    return sink
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    p = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    w = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    s = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    t0 = time.perf_counter()
+    results = simulate_batch(n, p, s, w)
+    elapsed = time.perf_counter() - t0
+    wins = [0] * p
+    for r in results:
+        wins[r.winner_id] += 1
+    print(f"{p}人局 x {n}: {n / elapsed * 60:,.0f} 局/分钟")
+    print("各座位胜率: " + " ".join(f"{seat}:{k / n:.1%}" for seat, k in enumerate(wins)))
@@ -0,0 +1,160 @@
+"""
+批量模拟的流式统计：订阅事件总线逐事件累加，不保存逐局日志
+多个进程各自累加后用 merge() 合并，任意时刻都可以导出汇总表
+"""
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from coup_basic import (ROLE_INDEX, ActionDeclared, ChallengeResolved, EventBus, GameEnded,
+                        PlayersSeated, TurnStarted)
+
+
+def hand_key(roles) -> str:
+    """起手牌的规范写法，与发牌顺序无关，如 duke+captain"""
+    return "+".join(r.value for r in sorted(roles, key=ROLE_INDEX.get))
+
+
+class CampaignStats:
+    """
+    可合并的统计累加器，每个事件O(1)更新：
+        座位胜率      按(玩家数, 座位号)
+        起手牌胜率    按 hand_key
+        行动频次      按 ActionType
+        质疑成功率    按被质疑的角色
+        对局长度      回合数的总和与平方和
+    只保存计数，可以直接pickle在进程间传递
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.seat_games: Counter = Counter()
+        self.seat_wins: Counter = Counter()
+        self.hand_games: Counter = Counter()
+        self.hand_wins: Counter = Counter()
+        self.actions: Counter = Counter()
+        self.challenges: Counter = Counter()
+        self.challenge_wins: Counter = Counter()
+        self.turns_total = 0
+        self.turns_sq_total = 0
+        # 进行中对局的临时状态
+        self._hands: List[str] = []
+        self._turn = 0
+
+    def attach(self, bus: EventBus) -> EventBus:
+        """订阅所需事件，须在创建 GameManager 之前订阅才能收到座次和起手牌"""
+        bus.subscribe(self._on_seated, PlayersSeated)
+        bus.subscribe(self._on_turn, TurnStarted)
+        bus.subscribe(self._on_action, ActionDeclared)
+        bus.subscribe(self._on_challenge, ChallengeResolved)
+        bus.subscribe(self._on_ended, GameEnded)
+        return bus
+
+    # ===== 事件处理 =====
+    def _on_seated(self, e: PlayersSeated):
+        self._hands = [hand_key(inf.role for inf in p.influence) for p in e.players]
+        self._turn = 0
+        pls = len(e.players)
+        for seat, hand in enumerate(self._hands):
+            self.seat_games[pls, seat] += 1
+            self.hand_games[hand] += 1
+
+    def _on_turn(self, e: TurnStarted):
+        self._turn = e.turn
+
+    def _on_action(self, e: ActionDeclared):
+        self.actions[e.action] += 1
+
+    def _on_challenge(self, e: ChallengeResolved):
+        self.challenges[e.role] += 1
+        if e.succeeded:
+            self.challenge_wins[e.role] += 1
+
+    def _on_ended(self, e: GameEnded):
+        self.games += 1
+        self.turns_total += self._turn
+        self.turns_sq_total += self._turn * self._turn
+        if e.winner is not None:
+            self.seat_wins[len(self._hands), e.winner.player_id] += 1
+            self.hand_wins[self._hands[e.winner.player_id]] += 1
+
+    # ===== 合并 =====
+    def merge(self, other: "CampaignStats") -> "CampaignStats":
+        """把另一个累加器（通常来自其他进程）的计数并入本累加器"""
+        self.games += other.games
+        self.seat_games.update(other.seat_games)
+        self.seat_wins.update(other.seat_wins)
+        self.hand_games.update(other.hand_games)
+        self.hand_wins.update(other.hand_wins)
+        self.actions.update(other.actions)
+        self.challenges.update(other.challenges)
+        self.challenge_wins.update(other.challenge_wins)
+        self.turns_total += other.turns_total
+        self.turns_sq_total += other.turns_sq_total
+        return self
+
+    def __getstate__(self):
+        # 进行中对局的临时状态不参与传输
+        state = self.__dict__.copy()
+        state["_hands"] = []
+        state["_turn"] = 0
+        return state
+
+    # ===== 汇总 =====
+    @property
+    def mean_turns(self) -> float:
+        return self.turns_total / self.games if self.games else 0.0
+
+    @property
+    def std_turns(self) -> float:
+        if not self.games:
+            return 0.0
+        mean = self.mean_turns
+        return max(0.0, self.turns_sq_total / self.games - mean * mean) ** 0.5
+
+    def seat_table(self) -> List[Tuple[int, int, int, float]]:
+        """[(玩家数, 座位号, 局数, 胜率)]"""
+        return [(pls, seat, n, self.seat_wins[pls, seat] / n)
+                for (pls, seat), n in sorted(self.seat_games.items())]
+
+    def hand_table(self) -> List[Tuple[str, int, float]]:
+        """[(起手牌, 出现次数, 胜率)]，按胜率从高到低"""
+        rows = [(hand, n, self.hand_wins[hand] / n) for hand, n in self.hand_games.items()]
+        return sorted(rows, key=lambda r: (-r[2], r[0]))
+
+    def action_table(self) -> List[Tuple[str, int, float]]:
+        """[(行动, 次数, 占比)]"""
+        total = sum(self.actions.values()) or 1
+        # 排序只依赖计数本身，与合并顺序无关
+        rows = sorted(self.actions.items(), key=lambda kv: (-kv[1], kv[0].value))
+        return [(a.value, n, n / total) for a, n in rows]
+
+    def challenge_table(self) -> List[Tuple[str, int, float]]:
+        """[(被质疑角色, 质疑次数, 质疑成功率)]"""
+        return [(r.value, n, self.challenge_wins[r] / n)
+                for r, n in sorted(self.challenges.items(), key=lambda kv: ROLE_INDEX[kv[0]])]
+
+    def summary(self) -> Dict[str, object]:
+        """导出全部汇总表，可在模拟中途随时调用"""
+        total_challenges = sum(self.challenges.values())
+        return {
+            "games": self.games,
+            "mean_turns": self.mean_turns,
+            "std_turns": self.std_turns,
+            "challenge_success_rate": (sum(self.challenge_wins.values()) / total_challenges
+                                       if total_challenges else 0.0),
+            "seats": self.seat_table(),
+            "hands": self.hand_table(),
+            "actions": self.action_table(),
+            "challenges": self.challenge_table(),
+        }
+
+    def format_summary(self, top_hands: Optional[int] = 5) -> str:
+        s = self.summary()
+        lines = [f"对局数: {s['games']}  平均回合数: {s['mean_turns']:.1f} (标准差 {s['std_turns']:.1f})",
+                 f"质疑成功率: {s['challenge_success_rate']:.1%}",
+                 "座位胜率: " + " ".join(f"{pls}人{seat}号:{rate:.1%}" for pls, seat, _, rate in s["seats"]),
+                 "行动占比: " + " ".join(f"{a}:{rate:.1%}" for a, _, rate in s["actions"]),
+                 "被质疑角色: " + " ".join(f"{r}:{n}次/成功{rate:.1%}" for r, n, rate in s["challenges"])]
+        hands = s["hands"] if top_hands is None else s["hands"][:top_hands]
+        lines.append("起手牌胜率: " + " ".join(f"{h}:{rate:.1%}" for h, _, rate in hands))
+        return "\n".join(lines)
@@ -0,0 +1,225 @@
+"""
+策略锦标赛：让不同的 ComputerPlayer 变体在全部座次排列上对战，边出结果边更新Elo等级分
+两两之间的胜率置信区间分开后即停止该组对局，不再为已有定论的比较消耗算力
+用法: python coup_tournament.py [玩家数] [进程数]
+"""
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Callable, Dict, List, Optional, Tuple
+
+from coup_basic import ComputerPlayer, GameManager, Role, derive_seed
+
+Layout = Tuple[str, ...]  # 按座次排列的变体名
+
+
+def seat_layouts(a: str, b: str, pls: int) -> List[Layout]:
+    """a、b两种变体交替入座的全部轮转排列，每个变体在每个座位上出现的次数相同"""
+    base = [a if seat % 2 == 0 else b for seat in range(pls)]
+    layouts = []
+    for pattern in (base, [b if name == a else a for name in base]):
+        for r in range(pls):
+            layouts.append(tuple(pattern[r:] + pattern[:r]))
+    return list(dict.fromkeys(layouts))
+
+
+def _play_block(variants: Dict[str, type], layouts: List[Layout],
+                seeds: List[int]) -> List[Tuple[Layout, Optional[int]]]:
+    """工作进程的任务单元：按给定座次和种子逐局对战，返回(座次, 获胜座位号)"""
+    results = []
+    for layout, seed in zip(layouts, seeds):
+        gm = GameManager(len(layout), 0, headless=True, seed=seed,
+                         cpu_types=[variants[name] for name in layout])
+        winner = gm.run_game()
+        results.append((layout, winner.player_id if winner else None))
+    return results
+
+
+class Tournament:
+    """
+    variants    变体名 -> ComputerPlayer子类（须定义在模块顶层，才能传给工作进程）
+    pairing     "round_robin" 每轮所有未定论的组合都打；"swiss" 每轮按当前等级分相邻配对
+    block_games 每组组合每轮的局数（向上取整到座次排列数的倍数）
+    min_games / max_games  每组组合至少/至多分出胜负的局数
+    z           置信区间的z值，默认2.58（约99%）
+    """
+
+    def __init__(self, variants: Dict[str, type], pls: int = 4, pairing: str = "round_robin",
+                 campaign_seed: int = 0, workers: Optional[int] = None, block_games: int = 48,
+                 min_games: int = 100, max_games: int = 5000, z: float = 2.58, k: float = 16.0):
+        if len(variants) < 2:
+            raise ValueError("至少需要两种变体")
+        if pairing not in ("round_robin", "swiss"):
+            raise ValueError(f"未知的配对方式: {pairing}")
+        if not (3 <= pls <= 10):
+            raise ValueError("总玩家数应在3到10之间")
+        self.variants = dict(variants)
+        self.pls = pls
+        self.pairing = pairing
+        self.campaign_seed = campaign_seed
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.block_games = block_games
+        self.min_games = min_games
+        self.max_games = max_games
+        self.z = z
+        self.k = k
+
+        self.ratings: Dict[str, float] = {name: 1500.0 for name in self.variants}
+        self.wins: Dict[Tuple[str, str], int] = {}  # (胜者, 负者) -> 局数
+        self.games_played = 0
+        self._next_index = 0  # 下一局的序号，用于派生种子
+
+    # ===== 结果与等级分 =====
+    def record(self, layout: Layout, winner_seat: Optional[int]):
+        """登记一局结果，同时增量更新Elo"""
+        self.games_played += 1
+        if winner_seat is None:
+            return
+        winner = layout[winner_seat]
+        for loser in sorted(set(layout) - {winner}):
+            self.wins[winner, loser] = self.wins.get((winner, loser), 0) + 1
+            expected = 1.0 / (1.0 + 10 ** ((self.ratings[loser] - self.ratings[winner]) / 400))
+            delta = self.k * (1.0 - expected)
+            self.ratings[winner] += delta
+            self.ratings[loser] -= delta
+
+    def decided(self, a: str, b: str) -> int:
+        """a与b同桌且分出胜负的局数"""
+        return self.wins.get((a, b), 0) + self.wins.get((b, a), 0)
+
+    def score_interval(self, a: str, b: str) -> Tuple[float, float, float]:
+        """a对b的胜率及其正态近似置信区间 (胜率, 下界, 上界)"""
+        n = self.decided(a, b)
+        if not n:
+            return 0.5, 0.0, 1.0
+        p = self.wins.get((a, b), 0) / n
+        half = self.z * math.sqrt(p * (1 - p) / n)
+        return p, max(0.0, p - half), min(1.0, p + half)
+
+    def settled(self, a: str, b: str) -> bool:
+        """置信区间已不含50%，或已达到局数上限"""
+        n = self.decided(a, b)
+        if n >= self.max_games:
+            return True
+        if n < self.min_games:
+            return False
+        _, low, high = self.score_interval(a, b)
+        return low > 0.5 or high < 0.5
+
+    def active_pairs(self) -> List[Tuple[str, str]]:
+        return [(a, b) for a, b in combinations(self.variants, 2) if not self.settled(a, b)]
+
+    # ===== 配对 =====
+    def _round_pairs(self) -> List[Tuple[str, str]]:
+        active = self.active_pairs()
+        if self.pairing == "round_robin" or not active:
+            return active
+        # 瑞士制：按等级分从高到低，每个变体与排在后面、尚未定论的最近对手配对
+        open_pairs = set(active) | {(b, a) for a, b in active}
+        ranked = sorted(self.variants, key=lambda name: -self.ratings[name])
+        paired = set()
+        pairs = []
+        for idx, a in enumerate(ranked):
+            if a in paired:
+                continue
+            for b in ranked[idx + 1:]:
+                if b not in paired and (a, b) in open_pairs:
+                    pairs.append((a, b))
+                    paired.update((a, b))
+                    break
+        return pairs or active[:1]
+
+    def _blocks(self, a: str, b: str) -> List[Tuple[List[Layout], List[int]]]:
+        """一组组合本轮的对局，按进程数切块以便并行"""
+        layouts = seat_layouts(a, b, self.pls)
+        reps = max(1, -(-self.block_games // len(layouts)))
+        games = layouts * reps
+        seeds = [derive_seed(self.campaign_seed, self._next_index + i) for i in range(len(games))]
+        self._next_index += len(games)
+        parts = max(1, min(self.workers, reps))
+        size = -(-len(games) // parts)
+        return [(games[lo:lo + size], seeds[lo:lo + size]) for lo in range(0, len(games), size)]
+
+    # ===== 运行 =====
+    def run(self, progress: Optional[Callable[["Tournament"], None]] = None) -> "Tournament":
+        """按轮次对战直到所有组合都有定论；每轮结束调用一次progress"""
+        if self.workers == 1:
+            while True:
+                pairs = self._round_pairs()
+                if not pairs:
+                    break
+                for a, b in pairs:
+                    for layouts, seeds in self._blocks(a, b):
+                        for layout, seat in _play_block(self.variants, layouts, seeds):
+                            self.record(layout, seat)
+                if progress:
+                    progress(self)
+            return self
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                pairs = self._round_pairs()
+                if not pairs:
+                    break
+                futures = [pool.submit(_play_block, self.variants, layouts, seeds)
+                           for a, b in pairs for layouts, seeds in self._blocks(a, b)]
+                # 结果按提交顺序记录，等级分和下一轮配对与进程数、完成先后无关
+                for future in futures:
+                    for layout, seat in future.result():
+                        self.record(layout, seat)
+                if progress:
+                    progress(self)
+        return self
+
+    # ===== 汇总 =====
+    def standings(self) -> List[Tuple[str, float]]:
+        return sorted(self.ratings.items(), key=lambda kv: -kv[1])
+
+    def pair_table(self) -> List[Tuple[str, str, int, float, float, float, bool]]:
+        """[(a, b, 分出胜负局数, a胜率, 下界, 上界, 是否已定论)]"""
+        rows = []
+        for a, b in combinations(self.variants, 2):
+            p, low, high = self.score_interval(a, b)
+            rows.append((a, b, self.decided(a, b), p, low, high, self.settled(a, b)))
+        return rows
+
+
+# ==================== 示例变体 ====================
+
+class ProvingComputerPlayer(ComputerPlayer):
+    """被质疑时只要有牌就亮牌，较少质疑别人"""
+
+    def challenge_or_not(self, pl, ro: Role) -> bool:
+        self._think()
+        return self.rng.random() < 0.25
+
+    def deal_challenge(self):
+        self._think()
+        return True
+
+
+class PassiveComputerPlayer(ComputerPlayer):
+    """从不质疑，被质疑时只要有牌就亮牌"""
+
+    def challenge_or_not(self, pl, ro: Role) -> bool:
+        self._think()
+        return False
+
+    def deal_challenge(self):
+        self._think()
+        return True
+
+
+if __name__ == '__main__':
+    p = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    w = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    t = Tournament({"random": ComputerPlayer, "proving": ProvingComputerPlayer,
+                    "passive": PassiveComputerPlayer}, pls=p, workers=w)
+    t.run()
+    print(f"{p}人局，共{t.games_played}局")
+    for name, rating in t.standings():
+        print(f"{name}: {rating:.0f}")
+    for a, b, n, score, low, high, done in t.pair_table():
+        print(f"{a} vs {b}: {n}局 {a}胜率{score:.1%} [{low:.1%}, {high:.1%}]{'' if done else ' 未定论'}")
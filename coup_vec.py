@@ -0,0 +1,369 @@
+"""
+NumPy 锁步向量化模拟：把K局同人数的全电脑对局存成数组，所有牌桌同时推进
+适用于随机/查表策略的大规模统计，不经过玩家对象、状态机和事件总线
+用法: python coup_vec.py [局数] [玩家数]
+
+规则与 coup_basic 的回合状态机一致，行动的目标、宣称角色、反制角色和花销都取自 ACTION_CONFIG：
+    行动宣称 -> 其他玩家按座次询问质疑 -> 支付花销 -> 反制（有目标的由目标反制，外援按座次询问）
+    -> 反制宣称的质疑 -> 结算 -> 轮到下一名存活玩家
+"""
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from coup_basic import ACTION_CONFIG, ActionType, ROLES, ROLE_INDEX, GameManager
+
+# ==================== 由 ACTION_CONFIG 生成的规则表 ====================
+ACTIONS = tuple(ActionType)
+ACTION_INDEX = {action: idx for idx, action in enumerate(ACTIONS)}
+N_ACTIONS = len(ACTIONS)
+N_ROLES = len(ROLES)
+
+ACTION_COST = np.array([ACTION_CONFIG[a].coins_cost for a in ACTIONS], dtype=np.int16)
+ACTION_TARGETED = np.array([ACTION_CONFIG[a].requires_target for a in ACTIONS])
+# 行动宣称的角色编码，无需宣称为-1
+ACTION_ROLE = np.array([ROLE_INDEX[ACTION_CONFIG[a].required_role] if ACTION_CONFIG[a].required_role else -1
+                        for a in ACTIONS], dtype=np.int8)
+# COUNTER_MASK[行动, 角色] 该角色能否反制该行动
+COUNTER_MASK = np.array([[r in ACTION_CONFIG[a].counterable_by for r in ROLES] for a in ACTIONS])
+
+INCOME = ACTION_INDEX[ActionType.INCOME]
+FOREIGN_AID = ACTION_INDEX[ActionType.FOREIGN_AID]
+TAX = ACTION_INDEX[ActionType.TAX]
+STEAL = ACTION_INDEX[ActionType.STEAL]
+ASSASSINATE = ACTION_INDEX[ActionType.ASSASSINATE]
+COUP = ACTION_INDEX[ActionType.COUP]
+EXCHANGE = ACTION_INDEX[ActionType.EXCHANGE]
+
+# 行动处理器中的直接收益（偷窃另算）
+ACTION_GAIN = np.zeros(N_ACTIONS, dtype=np.int16)
+ACTION_GAIN[INCOME] = 1
+ACTION_GAIN[FOREIGN_AID] = 2
+ACTION_GAIN[TAX] = 3
+
+# 与 Player.get_available_actions 一致的金币门槛
+ASSASSINATE_MIN_COINS = ACTION_CONFIG[ActionType.ASSASSINATE].coins_cost
+COUP_MIN_COINS = ACTION_CONFIG[ActionType.COUP].coins_cost
+FORCED_COUP_COINS = 10
+
+
+@dataclass(frozen=True)
+class VecPolicy:
+    """
+    查表策略，所有牌桌共用
+        action_weights  按 ACTIONS 顺序的行动权重，不合法的行动自动屏蔽
+        bluff           宣称自己没有的角色时，权重/概率乘以该系数
+        challenge_prob  对别人的宣称发起质疑的概率
+        counter_prob    有反制角色时宣称反制的概率（没有时再乘以bluff）
+    被质疑且确有该角色时总是亮牌应对；失去影响力和大使换牌都随机选择
+    """
+    action_weights: Tuple[float, ...] = (1.0,) * N_ACTIONS
+    bluff: float = 0.3
+    challenge_prob: float = 0.1
+    counter_prob: float = 0.5
+
+
+class VecGames:
+    """K局同时进行的对局，数据全部存放在数组中，座位号即玩家编号"""
+
+    def __init__(self, games: int, pls: int = 4, seed: Optional[int] = None,
+                 policy: Optional[VecPolicy] = None):
+        if not (3 <= pls <= 10):
+            raise ValueError("总玩家数应在3到10之间")
+        self.games = games
+        self.pls = pls
+        self.policy = policy if policy is not None else VecPolicy()
+        self.rng = np.random.default_rng(seed)
+        # 牌堆规模与 GameManager 相同
+        i = 0
+        while pls * 2 + 2 > (3 + i) * 5:
+            i = i + 2
+        self.copies = 3 + i
+
+        self.deck = np.full((games, N_ROLES), self.copies, dtype=np.int16)
+        self.roles = np.zeros((games, pls, 2), dtype=np.int8)
+        self.revealed = np.zeros((games, pls, 2), dtype=bool)
+        self.coins = np.full((games, pls), 2, dtype=np.int16)
+        self.current = np.zeros(games, dtype=np.int64)
+        self.turns = np.ones(games, dtype=np.int32)
+        self.done = np.zeros(games, dtype=bool)
+        self.winner = np.full(games, -1, dtype=np.int8)
+        # 以下两个是由 roles/revealed 派生的缓存，每次改动手牌时同步更新，省去反复归约
+        self.alive = np.ones((games, pls), dtype=bool)  # 是否还有暗牌
+        self.held = np.zeros((games, pls, N_ROLES), dtype=np.int8)  # 每种角色的暗牌张数
+
+        every = np.arange(games)
+        for p in range(pls):
+            for slot in range(2):
+                role = self._draw(every)
+                self.roles[:, p, slot] = role
+                self.held[every, p, role] += 1
+
+    # ==================== 查询 ====================
+    def _holds(self, g: np.ndarray, p: np.ndarray, role: np.ndarray) -> np.ndarray:
+        """(n,) 玩家p是否持有role的暗牌"""
+        return self.held[g, p, role] > 0
+
+    def check_invariants(self):
+        """每种角色的牌（牌堆+手牌）守恒，金币非负"""
+        onehot = self.roles[..., None] == np.arange(N_ROLES)
+        if not ((self.deck + onehot.sum(axis=(1, 2))) == self.copies).all():
+            raise AssertionError("牌的总数不守恒")
+        hidden = (onehot & ~self.revealed[..., None]).sum(axis=2)
+        if not ((hidden == self.held).all() and (self.alive == ~self.revealed.all(axis=2)).all()):
+            raise AssertionError("暗牌缓存与手牌不一致")
+        if (self.coins < 0).any():
+            raise AssertionError("出现负金币")
+
+    # ==================== 牌堆与影响力 ====================
+    def _draw(self, g: np.ndarray) -> np.ndarray:
+        """每局各从牌堆随机抽一张，返回角色编码"""
+        cum = self.deck[g].cumsum(axis=1)
+        pick = self.rng.integers(0, cum[:, -1])
+        role = (pick[:, None] >= cum).sum(axis=1)
+        self.deck[g, role] -= 1
+        return role
+
+    def _swap(self, g: np.ndarray, p: np.ndarray, role: np.ndarray):
+        """亮出的角色牌放回牌堆，再抽一张新牌替换"""
+        slot = np.where((self.roles[g, p, 0] == role) & ~self.revealed[g, p, 0], 0, 1)
+        self.deck[g, role] += 1
+        self.held[g, p, role] -= 1
+        new = self._draw(g)
+        self.roles[g, p, slot] = new
+        self.held[g, p, new] += 1
+
+    def _lose(self, g: np.ndarray, p: np.ndarray):
+        """玩家p失去一张影响力，有两张暗牌时随机翻开一张；已出局的玩家不受影响"""
+        h0 = ~self.revealed[g, p, 0]
+        h1 = ~self.revealed[g, p, 1]
+        slot = (h1 & (~h0 | (self.rng.random(len(g)) < 0.5))).astype(np.int64)
+        ok = h0 | h1
+        g, p, slot = g[ok], p[ok], slot[ok]
+        self.revealed[g, p, slot] = True
+        self.held[g, p, self.roles[g, p, slot]] -= 1
+        self.alive[g, p] = ~(self.revealed[g, p, 0] & self.revealed[g, p, 1])
+
+    # ==================== 询问 ====================
+    def _poll(self, g: np.ndarray, claimant: np.ndarray, prob) -> np.ndarray:
+        """
+        从claimant的下家开始按座次询问其他存活玩家，返回第一个愿意的座位号，无人愿意为-1
+        prob 为标量或 (n, P) 的每人概率
+        """
+        n, pls = len(g), self.pls
+        rows = np.arange(n)
+        want = (self.rng.random((n, pls)) < prob) & self.alive[g]
+        want[rows, claimant] = False
+        order = (claimant[:, None] + np.arange(1, pls)) % pls
+        ordered = np.take_along_axis(want, order, axis=1)
+        first = ordered.argmax(axis=1)
+        return np.where(ordered.any(axis=1), order[rows, first], -1)
+
+    def _challenge(self, g: np.ndarray, claimant: np.ndarray, role: np.ndarray) -> np.ndarray:
+        """
+        对宣称进行质疑并结算，返回宣称是否成立
+        确有其牌：亮牌换新，质疑者失去影响力；否则宣称者失去影响力
+        """
+        challenger = self._poll(g, claimant, self.policy.challenge_prob)
+        challenged = challenger >= 0
+        upheld = ~challenged
+        if challenged.any():
+            cg, cc, cr, ch = g[challenged], claimant[challenged], role[challenged], challenger[challenged]
+            truthful = self._holds(cg, cc, cr)
+            if truthful.any():
+                self._swap(cg[truthful], cc[truthful], cr[truthful])
+                self._lose(cg[truthful], ch[truthful])
+            lied = ~truthful
+            if lied.any():
+                self._lose(cg[lied], cc[lied])
+            upheld[challenged] = truthful
+        return upheld
+
+    # ==================== 回合 ====================
+    def _choose_actions(self, g: np.ndarray, actor: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        policy = self.policy
+        n, rows = len(g), np.arange(len(g))
+        coins = self.coins[g, actor]
+        legal = np.ones((n, N_ACTIONS), dtype=bool)
+        legal[:, ASSASSINATE] = coins >= ASSASSINATE_MIN_COINS
+        legal[:, COUP] = coins >= COUP_MIN_COINS
+        forced = coins >= FORCED_COUP_COINS
+        legal[forced] = False
+        legal[forced, COUP] = True
+
+        weights = np.asarray(policy.action_weights, dtype=np.float64) * legal
+        held = self.held[g, actor] > 0
+        claims = ACTION_ROLE >= 0
+        bluffing = ~held[:, np.maximum(ACTION_ROLE, 0)] & claims
+        weights = np.where(bluffing, weights * policy.bluff, weights)
+        cum = weights.cumsum(axis=1)
+        pick = self.rng.random(n) * cum[:, -1]
+        action = np.minimum((pick[:, None] >= cum).sum(axis=1), N_ACTIONS - 1)
+        # 浮点边界上可能落到权重为0的行动，退回到最后一个合法行动
+        bad = ~legal[rows, action]
+        if bad.any():
+            action[bad] = N_ACTIONS - 1 - legal[bad, ::-1].argmax(axis=1)
+
+        scores = self.rng.random((n, self.pls))
+        scores[~self.alive[g]] = -1.0
+        scores[rows, actor] = -1.0
+        target = np.where(ACTION_TARGETED[action], scores.argmax(axis=1), -1)
+        return action, target
+
+    def _counter(self, g: np.ndarray, actor: np.ndarray, action: np.ndarray,
+                 target: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """返回(反制者座位号或-1, 宣称的反制角色)"""
+        policy = self.policy
+        n, rows = len(g), np.arange(len(g))
+        counterer = np.full(n, -1, dtype=np.int64)
+        role = np.zeros(n, dtype=np.int64)
+        allowed = COUNTER_MASK[action]
+        holdings = self.held[g] > 0
+        alive = self.alive[g]
+
+        # 有目标的行动只能由目标反制
+        targeted = ACTION_TARGETED[action] & allowed.any(axis=1) & (target >= 0)
+        targeted &= alive[rows, np.maximum(target, 0)]
+        if targeted.any():
+            tr = rows[targeted]
+            tt = target[targeted]
+            usable = holdings[tr, tt] & allowed[tr]
+            has = usable.any(axis=1)
+            prob = np.where(has, policy.counter_prob, policy.counter_prob * policy.bluff)
+            go = self.rng.random(len(tr)) < prob
+            bluff_pick = (self.rng.random((len(tr), N_ROLES)) * allowed[tr]).argmax(axis=1)
+            claimed = np.where(has, usable.argmax(axis=1), bluff_pick)
+            counterer[tr[go]] = tt[go]
+            role[tr[go]] = claimed[go]
+
+        # 无目标的行动（外援）按座次询问其他玩家
+        untargeted = ~ACTION_TARGETED[action] & allowed.any(axis=1)
+        if untargeted.any():
+            ur = rows[untargeted]
+            usable = holdings[ur] & allowed[ur][:, None, :]
+            has = usable.any(axis=2)
+            prob = np.where(has, policy.counter_prob, policy.counter_prob * policy.bluff)
+            who = self._poll(g[ur], actor[ur], prob)
+            hit = who >= 0
+            if hit.any():
+                hr, hw = ur[hit], who[hit]
+                own = usable[hit, hw]
+                bluff_pick = (self.rng.random((len(hr), N_ROLES)) * allowed[hr]).argmax(axis=1)
+                counterer[hr] = hw
+                role[hr] = np.where(own.any(axis=1), own.argmax(axis=1), bluff_pick)
+        return counterer, role
+
+    def _exchange(self, g: np.ndarray, p: np.ndarray):
+        """大使换牌：抽2张，从暗牌和新牌中随机保留原暗牌数量张，其余放回牌堆"""
+        n, rows = len(g), np.arange(len(g))
+        hidden = ~self.revealed[g, p]
+        pool = np.full((n, 4), -1, dtype=np.int64)
+        pool[:, :2] = np.where(hidden, self.roles[g, p], -1)
+        pool[:, 2] = self._draw(g)
+        pool[:, 3] = self._draw(g)
+        scores = self.rng.random((n, 4))
+        scores[pool < 0] = 2.0
+        pool = np.take_along_axis(pool, scores.argsort(axis=1), axis=1)
+        # 暗牌依次换成打乱后的前几张
+        taken = np.zeros(n, dtype=np.int64)
+        self.held[g, p] = 0
+        for slot in range(2):
+            h = hidden[:, slot]
+            new = pool[rows[h], taken[h]]
+            self.roles[g[h], p[h], slot] = new
+            self.held[g[h], p[h], new] += 1
+            taken += h
+        # 剩下的有效牌（恰好2张）放回牌堆
+        for k in range(4):
+            back = (k >= taken) & (pool[:, k] >= 0)
+            np.add.at(self.deck, (g[back], pool[back, k]), 1)
+
+    def step_turn(self):
+        """所有未结束的牌桌各推进一个完整回合"""
+        g = np.flatnonzero(~self.done)
+        if not len(g):
+            return
+        actor = self.current[g]
+        action, target = self._choose_actions(g, actor)
+
+        # 1. 行动宣称的质疑
+        proceed = np.ones(len(g), dtype=bool)
+        claim = ACTION_ROLE[action] >= 0
+        if claim.any():
+            proceed[claim] = self._challenge(g[claim], actor[claim], ACTION_ROLE[action[claim]].astype(np.int64))
+
+        # 2. 支付花销
+        pg, pa, pact, ptgt = g[proceed], actor[proceed], action[proceed], target[proceed]
+        self.coins[pg, pa] -= ACTION_COST[pact]
+
+        # 3. 反制及反制宣称的质疑
+        counterer, role = self._counter(pg, pa, pact, ptgt)
+        countered = counterer >= 0
+        if countered.any():
+            upheld = self._challenge(pg[countered], counterer[countered], role[countered])
+            blocked = np.zeros(len(pg), dtype=bool)
+            blocked[countered] = upheld
+            keep = ~blocked
+            pg, pa, pact, ptgt = pg[keep], pa[keep], pact[keep], ptgt[keep]
+
+        # 4. 结算
+        self.coins[pg, pa] += ACTION_GAIN[pact]
+        steal = pact == STEAL
+        if steal.any():
+            sg, sa, st = pg[steal], pa[steal], ptgt[steal]
+            stolen = np.minimum(2, self.coins[sg, st])
+            self.coins[sg, st] -= stolen
+            self.coins[sg, sa] += stolen
+        hit = (pact == ASSASSINATE) | (pact == COUP)
+        if hit.any():
+            self._lose(pg[hit], ptgt[hit])
+        swap = pact == EXCHANGE
+        if swap.any():
+            xg, xa = pg[swap], pa[swap]
+            ok = self.alive[xg, xa]
+            self._exchange(xg[ok], xa[ok])
+
+        # 5. 判定结束并轮到下一名存活玩家
+        alive = self.alive[g]
+        over = alive.sum(axis=1) <= 1
+        if over.any():
+            self.done[g[over]] = True
+            self.winner[g[over]] = np.where(alive[over].any(axis=1), alive[over].argmax(axis=1), -1)
+        rest = ~over
+        if rest.any():
+            rg = g[rest]
+            order = (actor[rest][:, None] + np.arange(1, self.pls + 1)) % self.pls
+            ordered = np.take_along_axis(alive[rest], order, axis=1)
+            self.current[rg] = order[np.arange(len(rg)), ordered.argmax(axis=1)]
+        self.turns[g] += 1
+
+    def run(self, max_turns: int = 1000) -> np.ndarray:
+        """推进到全部牌桌结束（或达到回合上限），返回各局获胜者座位号（未结束为-1）"""
+        for _ in range(max_turns):
+            if self.done.all():
+                break
+            self.step_turn()
+        return self.winner
+
+
+def bench_vectorized(games: int = 10000, pls: int = 4, seed: Optional[int] = 0) -> float:
+    """向量化引擎每分钟完成的局数"""
+    start = time.perf_counter()
+    VecGames(games, pls, seed).run()
+    return games / (time.perf_counter() - start) * 60
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    p = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    vec_rate = bench_vectorized(n, p)
+    t0 = time.perf_counter()
+    obj_games = max(1, n // 10)
+    for s in range(obj_games):
+        GameManager(p, 0, headless=True, seed=s).run_game()
+    obj_rate = obj_games / (time.perf_counter() - t0) * 60
+    print(f"{p}人局 x {n}: 向量化 {vec_rate:,.0f} 局/分钟，对象引擎 {obj_rate:,.0f} 局/分钟，"
+          f"{vec_rate / obj_rate:.1f}倍")
@@ -0,0 +1,59 @@
+"""BeliefTracker 给 HandSampler 的权重：没有观测时不应改变确定化的分布"""
+import random
+
+from coup_basic import ROLE_INDEX, ActionDeclared, ActionType, EventBus, GameManager, Role
+from coup_belief import BeliefModel, BeliefTracker
+from coup_sampler import HAND_COMBOS, HandSampler
+
+
+def _fresh_table(seed: int = 1):
+    """3人无头对局，以0号座位为观察者建立信念，尚未发生任何行动"""
+    bus = EventBus()
+    gm = GameManager(3, 0, headless=True, seed=seed, bus=bus)
+    tracker = BeliefTracker(BeliefModel(), viewer=gm.players[0])
+    tracker.attach(bus)
+    tracker.bind([p.player_id for p in gm.players], 3 + gm.i, [inf.role for inf in gm.players[0].influence])
+    return gm, tracker
+
+
+def _combo_frequencies(sampler: HandSampler, weights, n: int, seed: int):
+    rng = random.Random(seed)
+    freq = [0] * len(HAND_COMBOS[sampler.sizes[0]])
+    for _ in range(n):
+        hands, _ = sampler.sample(rng, weights)
+        freq[HAND_COMBOS[len(hands[0])].index(tuple(sorted(hands[0])))] += 1
+    return [f / n for f in freq]
+
+
+def test_no_evidence_weights_are_uniform():
+    gm, tracker = _fresh_table()
+    sampler = HandSampler.for_player(gm, 0)
+    for w in tracker.weights(sampler.seats):
+        assert all(abs(x - 1.0) < 1e-12 for x in w)
+
+
+def test_no_evidence_weights_reproduce_unweighted_distribution():
+    gm, tracker = _fresh_table()
+    sampler = HandSampler.for_player(gm, 0)
+    n = 40000
+    weighted = _combo_frequencies(sampler, tracker.weights(sampler.seats), n, seed=2)
+    unweighted = _combo_frequencies(sampler, None, n, seed=3)
+    for a, b in zip(weighted, unweighted):
+        assert abs(a - b) < 0.01
+    # 成对组合的概率：先验只计一次时与整体洗牌一致
+    pairs = [c for c, combo in enumerate(HAND_COMBOS[2]) if combo[0] == combo[1]]
+    assert abs(sum(weighted[c] for c in pairs) - sum(unweighted[c] for c in pairs)) < 0.01
+
+
+def test_claim_scales_likelihood_ratio():
+    gm, tracker = _fresh_table()
+    model = tracker.model
+    opponent = gm.players[1]
+    gm.bus.publish(ActionDeclared(opponent, ActionType.TAX, None))
+    (w,) = tracker.weights([opponent.player_id])
+    duke = ROLE_INDEX[Role.DUKE]
+    with_duke = {w[c] for c, combo in enumerate(HAND_COMBOS[2]) if duke in combo}
+    without = {w[c] for c, combo in enumerate(HAND_COMBOS[2]) if duke not in combo}
+    ratio = max(with_duke) / max(without)
+    assert abs(ratio - 1.0 / model.bluff) < 1e-9
+    assert max(with_duke) - min(with_duke) < 1e-9